@@ -0,0 +1,132 @@
+"""
+Behavior Engine,
+Date: 2026-10-19,
+Description: Priority arbitration between the behaviors of the robot. A mode is a list of behaviors from the highest to the lowest priority, e.g. safety stop, obstacle avoidance, ball tracking and ball search. On every tick the triggers are checked in that order and only the first behavior whose trigger fires acts, so a lower behavior never sends a command while a higher one needs the car. The mode can be changed at runtime from another thread (the web interface); the change is applied by the control loop between two ticks, so only that thread ever talks to the car.
+"""
+
+
+
+
+# Load modules
+import time  # Idle wait and timestamps
+import threading  # Lock for the pending mode
+
+
+
+
+class Behavior:
+    """
+    One behavior of a mode.
+
+    Args:
+        name (str): Name shown in the web interface and the statistics.
+        trigger (callable): Called with the tick state (a dict shared by the behaviors of one tick),
+            returns True when the behavior wants the car. It may store measurements in the state.
+        action (callable): Called with the tick state when the behavior won the arbitration.
+        enter (callable): Optional, called once when the behavior becomes active, e.g. to start the motors.
+    """
+
+    def __init__(self, name, trigger, action, enter=None):
+        self.name = name
+        self.trigger = trigger
+        self.action = action
+        self.enter = enter
+
+class BehaviorEngine:
+    """
+    Runs the behaviors of the current mode with fixed priorities.
+
+    Args:
+        modes (dict): Behaviors of each mode, from the highest to the lowest priority.
+        mode (str): Initial mode.
+        on_mode (callable): Called with the old and the new mode by the control loop when the mode changes,
+            e.g. to stop the motors.
+        idle (float): Wait between ticks of a mode without behaviors (s).
+    """
+
+    def __init__(self, modes, mode, on_mode=None, idle=0.1):
+        if mode not in modes:
+            raise ValueError(f"Unknown mode '{mode}'")
+        self.modes = modes
+        self.mode = mode
+        self.on_mode = on_mode
+        self.idle = idle
+        self.pending = None    # Mode requested by another thread
+        self.active = None     # Behavior that acted on the last tick
+        self.since = time.monotonic()
+        self.ticks = 0
+        self.counts = {}       # Ticks won by each behavior
+        self.switches = 0
+        self.running = False
+        self.lock = threading.Lock()
+
+    def set_mode(self, mode):
+        """
+        Requests a mode change, applied by the control loop before its next tick.
+        """
+        if mode not in self.modes:
+            raise ValueError(f"Unknown mode '{mode}'")
+        with self.lock:
+            self.pending = mode
+
+    def tick(self):
+        """
+        Runs one arbitration round.
+
+        Returns:
+            name (str): Name of the behavior that acted, or None.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, None
+        if pending is not None and pending != self.mode:
+            old, self.mode = self.mode, pending
+            self.active = None  # Every behavior of the new mode starts fresh
+            self.switches += 1
+            if self.on_mode is not None:
+                self.on_mode(old, pending)
+
+        behaviors = self.modes[self.mode]
+        if not behaviors:
+            time.sleep(self.idle)
+            return None
+
+        state = {}
+        for behavior in behaviors:
+            if behavior.trigger(state):
+                break
+        else:
+            return None
+
+        if behavior.name != self.active:
+            self.active, self.since = behavior.name, time.monotonic()
+            if behavior.enter is not None:
+                behavior.enter()
+        behavior.action(state)
+        self.ticks += 1
+        self.counts[behavior.name] = self.counts.get(behavior.name, 0) + 1
+        return behavior.name
+
+    def run(self):
+        """
+        Ticks until stop() is called.
+        """
+        self.running = True
+        while self.running:
+            self.tick()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """
+        Returns the mode, the active behavior and the counters as a dictionary.
+        """
+        return {
+            'mode': self.mode,
+            'modes': {name: [b.name for b in behaviors] for name, behaviors in self.modes.items()},
+            'active': self.active,
+            'active_for': round(time.monotonic() - self.since, 1),
+            'ticks': self.ticks,
+            'counts': dict(self.counts),
+            'switches': self.switches,
+        }
@@ -0,0 +1,64 @@
+"""
+Behavior Decisions,
+Date: 2026-10-19,
+Description: Decision rules of the obstacle evasion and ball search behaviors, written as pure functions of the measurements and the tuning parameters. The robot applications and the offline policy evaluation both call these functions, so a parameter set tuned on recorded sessions behaves the same way on the car.
+"""
+
+
+
+
+def choose_evasion(dist_left, dist_right, dist_min):
+    """
+    Chooses the evasion maneuver of evade_obstacle() from the side distances.
+
+    Args:
+        dist_left (float): Distance measured with the head turned to the left (dist[1]).
+        dist_right (float): Distance measured with the head turned to the right (dist[2]).
+        dist_min (float): Minimum distance to an obstacle (cm).
+
+    Returns:
+        where (str): 'forward' if both sides are clear, 'left' or 'right' for the clear side, 'back' otherwise.
+    """
+    if dist_left > dist_min and dist_right > dist_min:  # Both sides clear
+        return 'forward'
+    elif dist_left > dist_min:  # More space to the left
+        return 'left'
+    elif dist_right > dist_min:  # More space to the right
+        return 'right'
+    return 'back'  # No space on either side
+
+def search_turn(dist_left, dist_right):
+    """
+    Chooses the direction of the 180-degree body turn of find_ball(), away from the closer side.
+
+    Args:
+        dist_left (float): Distance measured at the highest head angle of the search (170 degrees looks to the left).
+        dist_right (float): Distance measured at the lowest head angle of the search (10 degrees looks to the right).
+
+    Returns:
+        where (str): 'right' if the right side measured farther, 'left' otherwise.
+    """
+    return 'right' if dist_right > dist_left else 'left'
+
+def turn_time(angle, speed, d180):
+    """
+    Open-loop time of a body turn at a given speed.
+
+    Args:
+        angle (float): Turn angle in degrees.
+        speed (int): Car speed.
+        d180 (float): Equivalent rotation distance for a 180-degree turn (d180 or dturn).
+
+    Returns:
+        seconds (float): Time to keep the motors turning.
+    """
+    return d180 / speed * abs(angle) / 180
+
+def turn_angle(seconds, speed, d180):
+    """
+    Angle of an open-loop body turn of a given time, the inverse of turn_time().
+
+    Returns:
+        angle (float): Turn angle in degrees.
+    """
+    return 180 * seconds * speed / d180
@@ -0,0 +1,180 @@
+"""
+Ball Detector Benchmark,
+Date: 2026-10-19,
+Description: Compares the HSV color pipeline of capture() with the learned detector on the 800x600 scene of bench_proposals.py (textured background, red strips as clutter and a rolling red ball), or on a recorded camera frame given with --frame. A flat red disc is not something a detection model was trained on, so the ball is drawn as a shaded sphere with a specular highlight, a seam and a contact shadow. The HSV path is timed per frame. The model is timed for every combination of batch size and inference threads, keeping one batch in flight, which gives its sustained frames/second and the latency from submit to result. A paced run then feeds frames at the camera rate through detect() with a budget of one frame interval, as capture() does, and reports how many frames the model answered, how many fell back to HSV and the end-to-end latency. For every path the script also reports how often the ball was found. Without --model the model rows are reported as unmeasured.
+
+Usage: python bench_detector.py --model yolov8n.onnx --frame recorded.jpg --batch 1 2 4 --threads 1 2 4 --fps 10
+"""
+
+
+
+
+# Load modules
+import time  # Time-related functions
+import argparse  # Command-line arguments
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+from bench_proposals import RED, scene, ball_x  # Same synthetic scene
+from proposals import color_contours, circularity  # Current pipeline
+from detectors import DnnDetector  # Path under test
+
+
+
+
+BALL_Y, BALL_R = 330, 25  # Center height and radius of the ball (px)
+
+def sphere(radius):
+    """
+    Shading of a sphere lit from the upper left: a color factor and a highlight weight per pixel, zero outside.
+    """
+    y, x = np.mgrid[-radius:radius + 1, -radius:radius + 1] / radius
+    inside = x ** 2 + y ** 2 <= 1
+    z = np.sqrt(np.clip(1 - x ** 2 - y ** 2, 0, 1))
+    light = np.array([-0.4, -0.5, 0.77])
+    lambert = np.clip(x * light[0] + y * light[1] + z * light[2], 0, 1)
+    shade = np.where(inside, 0.35 + 0.65 * lambert, 0)
+    highlight = np.where(inside, np.clip(lambert, 0, 1) ** 40, 0)
+    return shade, highlight, inside
+
+def frame(background, n, rng, shading=sphere(BALL_R)):
+    """
+    Draws the shaded ball at its position for frame n and adds sensor noise.
+    """
+    img = background.copy()
+    shade, highlight, inside = shading
+    x0, y0 = ball_x(n) - BALL_R, BALL_Y - BALL_R
+    cv.ellipse(img, (ball_x(n) + 6, BALL_Y + BALL_R - 2), (BALL_R, 6), 0, 0, 360, (20, 20, 20), -1)  # Contact shadow
+    patch = img[y0:y0 + 2 * BALL_R + 1, x0:x0 + 2 * BALL_R + 1].astype(float)
+    color = np.array([60, 10, 210]) * shade[..., None]  # Hue 172, in the second red range
+    color = color + (255 - color) * highlight[..., None]
+    patch[inside] = color[inside]
+    seam = np.zeros(shade.shape, dtype='uint8')
+    cv.ellipse(seam, (BALL_R, BALL_R), (BALL_R, BALL_R // 3), (n * 4) % 180, 0, 360, 1, 1)  # Seam turning as it rolls
+    patch[(seam > 0) & inside] *= 0.5
+    img[y0:y0 + 2 * BALL_R + 1, x0:x0 + 2 * BALL_R + 1] = patch.astype('uint8')
+    return cv.add(img, rng.integers(0, 6, img.shape, dtype='uint8'))
+
+def recorded(path):
+    """
+    Loads a recorded camera frame as the background.
+    """
+    img = cv.imread(path)
+    if img is None:
+        raise SystemExit(f"Cannot read {path}")
+    return cv.resize(img, (800, 600))
+
+def hsv_ball(img):
+    """
+    Picks the largest round contour below the horizon like capture() and returns its center.
+    """
+    best, area_max = None, 20
+    for c in color_contours(img, RED):
+        M = cv.moments(c)
+        if M['m00'] > area_max and 600 - M['m01'] / M['m00'] < 491 and circularity(c) >= 0.5:
+            best, area_max = (M['m10'] / M['m00'], M['m01'] / M['m00']), M['m00']
+    return best
+
+def box_ball(boxes):
+    """
+    Center of the best box below the horizon, like select_box() in the robot core.
+    """
+    for x, y, w, h, _ in boxes or []:
+        if 600 - (y + h / 2) < 491:
+            return x + w / 2, y + h / 2
+    return None
+
+def hit(center, n):
+    return center is not None and abs(center[0] - ball_x(n)) < 30 and abs(center[1] - BALL_Y) < 30
+
+def report(name, latencies, fps, found, extra=''):
+    latencies = np.array(latencies) * 1000
+    print(f"{name:>24}: {fps:6.1f} frames/s, p50 {np.percentile(latencies, 50):7.2f} ms, "
+          f"p95 {np.percentile(latencies, 95):7.2f} ms, ball found {found * 100:3.0f}%{extra}")
+
+def run_hsv(frames):
+    """
+    Times the HSV pipeline frame by frame.
+    """
+    times, found = [], 0
+    for n, img in enumerate(frames):
+        start = time.perf_counter()
+        center = hsv_ball(img)
+        times.append(time.perf_counter() - start)
+        found += hit(center, n)
+    return times, len(frames) / sum(times), found / len(frames)
+
+def run_model(detector, frames):
+    """
+    Keeps one batch in flight and times every frame from submit to result.
+    """
+    latencies, found = [], 0
+    start = time.monotonic()
+    for first in range(0, len(frames), detector.batch):
+        pending = [detector.submit(img) for img in frames[first:first + detector.batch]]
+        for n, p in enumerate(pending, first):
+            p.done.wait()
+            if p.finished is not None:
+                latencies.append(p.finished - p.submitted)
+            found += hit(box_ball(p.boxes), n)
+    return latencies, len(frames) / (time.monotonic() - start), found / len(frames)
+
+def run_paced(detector, frames, fps):
+    """
+    Feeds frames at the camera rate through detect(), falling back to HSV like capture().
+    """
+    latencies, found, model = [], 0, 0
+    start = time.monotonic()
+    for n, img in enumerate(frames):
+        due = start + n / fps
+        time.sleep(max(0.0, due - time.monotonic()))
+        t0 = time.monotonic()
+        boxes = detector.detect(img)
+        if boxes is not None:
+            center = box_ball(boxes)
+            model += 1
+        else:
+            center = hsv_ball(img)
+        latencies.append(time.monotonic() - t0)
+        found += hit(center, n)
+    return latencies, len(frames) / (time.monotonic() - start), found / len(frames), model / len(frames)
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('Description: ')[1].split('\n')[0])
+    parser.add_argument('--model', help='ONNX detection model, only the HSV path is timed without it')
+    parser.add_argument('--backend', choices=['opencv', 'onnxruntime'], default='opencv', help='inference backend')
+    parser.add_argument('--size', type=int, default=320, help='model input size')
+    parser.add_argument('--layout', choices=['yolov8', 'yolov5'], default='yolov8', help='model output layout')
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 2, 4], help='batch sizes')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help='inference threads')
+    parser.add_argument('--fps', type=float, default=10, help='camera rate of the paced run')
+    parser.add_argument('--frames', type=int, default=200, help='number of frames per run')
+    parser.add_argument('--frame', help='recorded camera frame used as the background instead of the synthetic scene')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    background = recorded(args.frame) if args.frame else scene(rng)
+    frames = [frame(background, n, rng) for n in range(args.frames)]
+
+    report('hsv', *run_hsv(frames))
+    if not args.model:
+        print(f"{'model':>24}: unmeasured, no --model given")
+        return
+
+    for threads in args.threads:
+        for batch in args.batch:
+            detector = DnnDetector(args.model, backend=args.backend, threads=threads, batch=batch,
+                                   size=(args.size, args.size), layout=args.layout, budget=1 / args.fps)
+            run_model(detector, frames[:batch])  # Warm-up
+            report(f"model b{batch} t{threads}", *run_model(detector, frames))
+            latencies, fps, found, model = run_paced(detector, frames, args.fps)
+            report(f"paced b{batch} t{threads}", latencies, fps, found,
+                   f", model {model * 100:.0f}% / hsv {(1 - model) * 100:.0f}% of frames, {detector.stats()['late']} late")
+
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Candidate Proposal Benchmark,
+Date: 2026-10-19,
+Description: Compares the full-frame color pipeline of capture() with the motion proposal path on a synthetic 800x600 scene. The scene has a still camera, a textured background, several red strips (clutter) and a red ball rolling across the floor, drawn on both sides of the hue wraparound so that both red ranges are exercised. Both paths apply the same area, horizon and circularity filters as select_ball(). For each path the script reports the time per frame, the share of the frame that was color-classified, how many contours had their moments computed and how often the selected contour was the ball rather than clutter.
+
+Usage: python bench_proposals.py --frames 300
+"""
+
+
+
+
+# Load modules
+import time  # Time-related functions
+import argparse  # Command-line arguments
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+from proposals import MotionProposer, color_contours, circularity  # Path under test
+
+
+
+
+# Both red ranges used by capture()
+RED = [
+    (np.array([0, 150, 100], dtype="uint8"), np.array([10, 255, 255], dtype="uint8")),
+    (np.array([170, 150, 100], dtype="uint8"), np.array([180, 255, 255], dtype="uint8")),
+]
+
+def scene(rng):
+    """
+    Builds the still background with red clutter.
+    """
+    img = cv.GaussianBlur(rng.integers(40, 200, (600, 800, 3), dtype='uint8'), (7, 7), 0)
+    for x, y in [(60, 150), (300, 80), (620, 200), (500, 420), (100, 480)]:
+        cv.rectangle(img, (x, y), (x + 150, y + 18), (20, 20, 200), -1)  # Red strips (hue 0), circularity 0.3
+    return img
+
+def ball_x(n):
+    """
+    Horizontal position of the ball in frame n.
+    """
+    return 100 + (n * 4) % 600
+
+def frame(background, n, rng):
+    """
+    Draws the ball at its position for frame n and adds sensor noise.
+    """
+    img = background.copy()
+    cv.circle(img, (ball_x(n), 330), 25, (60, 10, 210), -1)  # Hue 172, in the second red range
+    return cv.add(img, rng.integers(0, 6, img.shape, dtype='uint8'))
+
+def evaluate(cont):
+    """
+    Picks the largest round contour below the horizon like select_ball(), counting the moments computed.
+    """
+    best, area_max = None, 20
+    for c in cont:
+        M = cv.moments(c)
+        if M['m00'] > area_max and 600 - M['m01'] / M['m00'] < 491 and circularity(c) >= 0.5:
+            best, area_max = c, M['m00']
+    return best, len(cont)
+
+def run(frames, proposer):
+    """
+    Runs one path over the frames and returns its statistics.
+    """
+    times, coverage, moments, found = [], [], 0, 0
+    for n, img in enumerate(frames):
+        start = time.perf_counter()
+        rois = proposer.propose(img) if proposer is not None else None
+        cont = color_contours(img, RED, rois)
+        best, count = evaluate(cont)
+        if best is None and rois:
+            cont = color_contours(img, RED)  # Same fallback as capture()
+            best, more = evaluate(cont)
+            count += more
+        if proposer is not None:
+            proposer.remember(cv.boundingRect(best) if best is not None else None)
+        times.append(time.perf_counter() - start)
+        coverage.append(sum(w * h for _, _, w, h in rois) / (800 * 600) if rois else 1.0)
+        moments += count
+        if best is not None:
+            x, y, w, h = cv.boundingRect(best)
+            found += abs(x + w / 2 - ball_x(n)) < 30 and abs(y + h / 2 - 330) < 30
+    return np.array(times) * 1000, np.mean(coverage), moments / len(frames), found / len(frames)
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('Description: ')[1].split('\n')[0])
+    parser.add_argument('--frames', type=int, default=300, help='number of frames per path')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    background = scene(rng)
+    frames = [frame(background, n, rng) for n in range(args.frames)]
+
+    proposer = MotionProposer()
+    proposer.set_stationary(True)  # Car stopped after cmd(car, do='stop')
+    for img in frames[:10]:
+        proposer.observe(img)      # Background thread warming up the model
+
+    for name, p in [('full frame', None), ('proposals', proposer)]:
+        t, coverage, moments, found = run(frames, p)
+        print(f"{name:>10}: p50 {np.percentile(t, 50):.2f} ms, p95 {np.percentile(t, 95):.2f} ms, "
+              f"classified {coverage * 100:.1f}% of the frame, {moments:.1f} contours/frame, ball found {found * 100:.0f}%")
+    print(f"Proposer: {proposer.stats()}")
+
+
+
+
+if __name__ == '__main__':
+    main()
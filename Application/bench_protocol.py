@@ -0,0 +1,265 @@
+"""
+Command Protocol Stress Test,
+Date: 2026-10-19,
+Description: Runs the command protocol of cmd() against a local stand-in for the car on a loopback socket. The stand-in frames commands like the ESP32 firmware and answers with '{<H>_<value>}' replies. On the way back it impairs the stream: replies are delayed with random jitter, merged into one write, cut into fragments at random byte positions (also inside multi-byte UTF-8 characters), dropped, and mixed with '{Heartbeat}' frames and unsolicited status text. Every reply carries a value derived from its command id, so each matched reply can be checked. For each seed the script reports sustained commands per second, the latency percentiles, the replies matched to the wrong command and the channel counters, for the CommandChannel used by cmd() and for the original single-recv reply loop.
+
+Usage: python bench_protocol.py --commands 2000 --seeds 5 --drop 0.01 --pipeline 1
+"""
+
+
+
+
+# Load modules
+import re  # Reply parsing of the original loop
+import json  # Command messages
+import time  # Time-related functions
+import heapq  # Replies ordered by send time
+import random  # Impairments
+import socket  # Loopback connection
+import argparse  # Command-line arguments
+import threading  # Stand-in threads
+from collections import Counter  # Errors by type
+from car_protocol import CommandChannel  # Path under test
+
+
+
+
+STATUS = '{Estado: batería ✓}'  # Unsolicited text with multi-byte characters
+
+def expected(msg):
+    """
+    Reply value of the stand-in for a command, derived from its id.
+    """
+    n, h = msg.get('N'), int(msg['H'])
+    if n == 21:
+        return str(h % 400)             # Distance
+    elif n == 6:
+        return f"{h},0,16384,0,0,0"     # Motion
+    elif n == 23:
+        return 'false'                  # Not lifted
+    return 'ok'
+
+class FakeCar:
+    """
+    Loopback stand-in for the command socket of the car, with an impaired reply path.
+
+    Args:
+        seed (int): Seed of the impairments.
+        delay (float): Base reply delay (s).
+        jitter (float): Mean of the extra exponential delay (s).
+        merge (float): Probability that a reply waits for the next one and both are written at once.
+        fragment (float): Probability that a write is cut into random fragments.
+        drop (float): Probability that a command gets no reply.
+        heartbeat (float): Interval of the '{Heartbeat}' frames (s).
+        noise (float): Probability of unsolicited status text before a reply.
+    """
+
+    def __init__(self, seed=0, delay=0.0005, jitter=0.002, merge=0.3, fragment=0.5, drop=0.0, heartbeat=0.05, noise=0.05):
+        self.rng = random.Random(seed)
+        self.delay, self.jitter = delay, jitter
+        self.merge, self.fragment = merge, fragment
+        self.drop, self.heartbeat, self.noise = drop, heartbeat, noise
+        self.queue = []       # (due time, order, bytes)
+        self.order = 0
+        self.last_due = 0.0
+        self.dropped = 0
+        self.running = True
+        self.cond = threading.Condition()
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def schedule(self, data, due):
+        with self.cond:
+            due = max(due, self.last_due)  # The board answers in order
+            self.last_due = due
+            self.order += 1
+            heapq.heappush(self.queue, (due, self.order, data))
+            self.cond.notify()
+
+    def serve(self):
+        client, _ = self.server.accept()
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.sendall(b'{Heartbeat}')  # Greeting read by connect()
+        threading.Thread(target=self.write, args=(client,), daemon=True).start()
+        buffer = ''
+        while self.running:
+            data = client.recv(1024)
+            if not data:
+                break
+            buffer += data.decode()
+            while '}' in buffer:  # Commands are flat JSON objects, framed by braces like the firmware
+                frame, buffer = buffer.split('}', 1)
+                msg = json.loads(frame[frame.index('{'):] + '}')
+                if self.rng.random() < self.drop:
+                    self.dropped += 1
+                    continue
+                reply = '{' + msg['H'] + '_' + expected(msg) + '}'
+                if self.rng.random() < self.noise:
+                    reply = STATUS + reply
+                self.schedule(reply.encode(), time.monotonic() + self.delay + self.rng.expovariate(1 / self.jitter))
+        self.running = False
+
+    def write(self, client):
+        beat = time.monotonic()
+        while self.running:
+            with self.cond:
+                now = time.monotonic()
+                due = min(self.queue[0][0] if self.queue else now + 0.01, beat + self.heartbeat)
+                if due > now:
+                    self.cond.wait(due - now)
+                    continue
+                data = b''
+                if now >= beat + self.heartbeat:
+                    data += b'{Heartbeat}'
+                    beat = now
+                while self.queue and self.queue[0][0] <= now:
+                    data += heapq.heappop(self.queue)[2]
+                    if self.queue and self.rng.random() < self.merge:
+                        data += heapq.heappop(self.queue)[2]  # Coalesced with the next reply
+                chunks = [data]
+                if len(data) > 1 and self.rng.random() < self.fragment:
+                    cuts = sorted(self.rng.sample(range(1, len(data)), min(len(data) - 1, self.rng.randint(1, 4))))
+                    chunks = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+            try:
+                for chunk in chunks:
+                    client.sendall(chunk)
+                    if len(chunks) > 1:
+                        time.sleep(self.rng.random() * 0.0005)  # Separate TCP segments
+            except OSError:
+                break
+
+    def close(self):
+        self.running = False
+        self.server.close()
+
+
+
+
+def legacy(sock, msg, timeout):
+    """
+    The original reply loop of cmd(): one recv() until an underscore shows up.
+
+    Raises:
+        TimeoutError: No reply within the timeout. The original loop would wait forever, and heartbeats keep recv() from timing out on its own.
+    """
+    sock.send(json.dumps(msg).encode())
+    deadline = time.monotonic() + timeout
+    while True:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"No reply to command {msg['H']}")
+        sock.settimeout(max(deadline - time.monotonic(), 0.001))
+        res = sock.recv(1024).decode()
+        if '_' in res:
+            break
+    return re.search('_(.*)}', res).group(1)
+
+def commands(count, rng):
+    """
+    Random mix of the commands sent by the behaviors.
+    """
+    kinds = [
+        {"N": 21, "D1": 2},                   # Distance
+        {"N": 6},                             # Motion
+        {"N": 23},                            # Lifted check
+        {"N": 4, "D1": 100, "D2": 80},        # Wheel speeds
+        {"N": 1, "D1": 0, "D2": 0, "D3": 1},  # Stop
+    ]
+    return [dict(rng.choice(kinds), H=str(n + 1)) for n in range(count)]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else float('nan')
+
+def run(mode, seed, args):
+    """
+    Sends the commands of one seed through one reply path and returns its statistics.
+    """
+    car = FakeCar(seed, args.delay, args.jitter, args.merge, args.fragment, args.drop, args.heartbeat, args.noise)
+    sock = socket.create_connection(('127.0.0.1', car.port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.recv(1024)  # Greeting
+    channel = CommandChannel(timeout=args.timeout, retries=args.retries)
+    msgs = commands(args.commands, random.Random(seed))
+    latencies, wrong, errors = [], 0, []
+
+    start = time.monotonic()
+    n = 0
+    while n < len(msgs):
+        window = msgs[n:n + args.pipeline]
+        sent = time.monotonic()
+        try:
+            if mode == 'legacy':
+                values = [legacy(sock, msg, args.timeout) for msg in window]
+            else:
+                for msg in window:
+                    channel.send(sock, msg)  # Pipelined, the replies come back coalesced
+                values = [channel.request(sock, msg, sent=True) for msg in window]  # Lost replies are sent again and counted by the channel
+        except Exception as e:
+            errors.append(type(e).__name__)
+            n += len(window)
+            continue
+        done = time.monotonic()
+        for msg, value in zip(window, values):
+            latencies.append((done - sent) * 1000)
+            wrong += value != expected(msg)
+        n += len(window)
+    elapsed = time.monotonic() - start
+
+    sock.close()
+    car.close()
+    return {
+        'completed': len(latencies),
+        'rate': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies) if latencies else float('nan'),
+        'wrong': wrong,
+        'errors': errors,
+        'dropped': car.dropped,
+        'channel': channel.stats() if mode == 'channel' else None,
+    }
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('Description: ')[1].split('\n')[0])
+    parser.add_argument('--commands', type=int, default=2000, help='commands per seed')
+    parser.add_argument('--seeds', type=int, default=5, help='number of random seeds')
+    parser.add_argument('--mode', choices=['channel', 'legacy', 'both'], default='both', help='reply path to test')
+    parser.add_argument('--pipeline', type=int, default=1, help='commands sent before reading their replies')
+    parser.add_argument('--delay', type=float, default=0.0005, help='base reply delay (s)')
+    parser.add_argument('--jitter', type=float, default=0.002, help='mean extra reply delay (s)')
+    parser.add_argument('--merge', type=float, default=0.3, help='probability of coalescing two replies')
+    parser.add_argument('--fragment', type=float, default=0.5, help='probability of fragmenting a write')
+    parser.add_argument('--drop', type=float, default=0.0, help='probability of dropping a reply')
+    parser.add_argument('--heartbeat', type=float, default=0.05, help='heartbeat interval (s), 1.0 on the car')
+    parser.add_argument('--noise', type=float, default=0.05, help='probability of unsolicited status text')
+    parser.add_argument('--timeout', type=float, default=0.2, help='reply timeout (s)')
+    parser.add_argument('--retries', type=int, default=2, help='resends after a timeout')
+    args = parser.parse_args()
+
+    failed = False
+    modes = ['channel', 'legacy'] if args.mode == 'both' else [args.mode]
+    for mode in modes:
+        print(f"{mode}:")
+        for seed in range(args.seeds):
+            r = run(mode, seed, args)
+            print(f"  seed {seed}: {r['completed']}/{args.commands} commands, {r['rate']:.0f} cmd/s, "
+                  f"p50 {r['p50']:.2f} ms, p95 {r['p95']:.2f} ms, p99 {r['p99']:.2f} ms, max {r['max']:.1f} ms, "
+                  f"wrong replies {r['wrong']}, dropped {r['dropped']}, errors {len(r['errors'])}"
+                  + (f" {dict(Counter(r['errors']))}" if r['errors'] else ''))
+            if r['channel'] is not None:
+                print(f"    channel: {r['channel']}")
+                failed |= r['wrong'] > 0 or (not args.drop and r['completed'] < args.commands)
+    raise SystemExit(1 if failed else 0)
+
+
+
+
+if __name__ == '__main__':
+    main()
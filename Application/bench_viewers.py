@@ -0,0 +1,164 @@
+"""
+Viewer Load Benchmark,
+Date: 2026-10-19,
+Description: Measures how browser viewers of /video_feed affect the control loop. The script starts the same streaming stack as the robot applications with a synthetic 800x600 camera at 10 fps and a simulated control loop that runs the color filtering steps of capture() every 50 ms. It then opens N browsers from separate processes, each with an MJPEG viewer and a Socket.IO long-polling session like the web interface, and reports the control loop tick time (p50/p95/max), the frame rate each viewer received and the response time of an API request sent while the browsers are connected.
+
+Usage: python bench_viewers.py --viewers 4 --seconds 20 --mode production
+"""
+
+
+
+
+# Load modules
+import os  # Environment configuration
+import time  # Time-related functions
+import argparse  # Command-line arguments
+import json  # Socket.IO handshake
+import threading  # Thread-based parallelism
+import multiprocessing  # Viewer processes
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+from urllib.request import urlopen, Request  # To open the MJPEG stream and the Socket.IO polls
+from flask import Flask, jsonify  # Web server
+from flask_socketio import SocketIO  # Socket communication for web interface
+from streaming import FrameBroadcaster, run_server  # Stack under test
+
+
+
+
+def camera(broadcaster, stop):
+    """
+    Publishes a noisy synthetic frame every 100 ms, like the capture thread.
+    """
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (600, 800, 3), dtype='uint8')
+    while not stop.is_set():
+        img = cv.add(base, rng.integers(0, 8, (600, 800, 3), dtype='uint8'))
+        broadcaster.publish(img)
+        time.sleep(0.1)
+
+def control_loop(ticks, stop):
+    """
+    Runs the filtering steps of capture() every 50 ms and records how long each tick took.
+    """
+    img = np.random.default_rng(1).integers(0, 255, (600, 800, 3), dtype='uint8')
+    lower, upper = np.array([170, 150, 100], dtype='uint8'), np.array([180, 255, 255], dtype='uint8')
+    while not stop.is_set():
+        start = time.perf_counter()
+        mask = cv.medianBlur(img, 5)
+        mask = cv.inRange(cv.cvtColor(mask, cv.COLOR_BGR2HSV), lower, upper)
+        mask = cv.dilate(cv.erode(mask, None, iterations=2), None, iterations=2)
+        ticks.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+def probe(url, latencies, stop):
+    """
+    Sends an API request every 200 ms and records its response time, None when it timed out.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            urlopen(url, timeout=2).read()
+            latencies.append(time.perf_counter() - start)
+        except OSError:
+            latencies.append(None)
+        time.sleep(0.2)
+
+def poller(base, deadline):
+    """
+    Keeps a Socket.IO session open by long-polling, like the web interface without WebSocket support.
+    """
+    url = base + '/socket.io/?EIO=4&transport=polling'
+    try:
+        handshake = urlopen(url, timeout=5).read().decode()
+        url += '&sid=' + json.loads(handshake[1:])['sid']
+        urlopen(Request(url, data=b'40'), timeout=5).read()  # Join the default namespace
+        while time.monotonic() < deadline:
+            packets = urlopen(url, timeout=60).read().decode()  # Held by the server until a ping or an event
+            if '2' in packets.split('\x1e'):
+                urlopen(Request(url, data=b'3'), timeout=5).read()  # Answer the ping
+    except OSError:
+        pass  # Rejected or closed session
+
+def viewer(base, seconds, result):
+    """
+    Opens a Socket.IO session, reads the MJPEG stream for a while and stores the number of frames received.
+    """
+    frames = 0
+    deadline = time.monotonic() + seconds
+    threading.Thread(target=poller, args=(base, deadline), daemon=True).start()
+    try:
+        stream = urlopen(base + '/video_feed', timeout=5)
+        while time.monotonic() < deadline:
+            line = stream.readline()
+            if not line:
+                break
+            if line.startswith(b'--frame'):
+                frames += 1
+    except OSError:
+        pass  # Rejected or dropped viewer, counted with the frames it got
+    result.put(frames)
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('Description: ')[1].split('\n')[0])
+    parser.add_argument('--viewers', type=int, default=4, help='number of simulated browsers')
+    parser.add_argument('--seconds', type=float, default=20, help='duration of the measurement')
+    parser.add_argument('--mode', choices=['dev', 'production'], default='production', help='server mode')
+    parser.add_argument('--port', type=int, default=5055, help='port of the benchmark server')
+    args = parser.parse_args()
+    os.environ['SERVER_MODE'] = args.mode
+
+    # Same stack as the applications, with enough room for every simulated viewer
+    app = Flask(__name__)
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    broadcaster = FrameBroadcaster(max_viewers=args.viewers)
+    app.add_url_rule('/video_feed', 'video_feed', broadcaster.response)
+    app.add_url_rule('/status', 'status', lambda: jsonify(broadcaster.stats()))  # Stands in for the API routes
+
+    stop = threading.Event()
+    ticks = []
+    threading.Thread(target=run_server, args=(app, socketio, '127.0.0.1', args.port, args.viewers), daemon=True).start()
+    threading.Thread(target=camera, args=(broadcaster, stop), daemon=True).start()
+    time.sleep(1)  # Let the server start
+
+    # Baseline without viewers, then the same time with viewers connected
+    threading.Thread(target=control_loop, args=(ticks, stop), daemon=True).start()
+    time.sleep(args.seconds / 2)
+    baseline = np.array(ticks) * 1000
+    ticks.clear()
+
+    result = multiprocessing.Queue()
+    base = f'http://127.0.0.1:{args.port}'
+    procs = [multiprocessing.Process(target=viewer, args=(base, args.seconds, result)) for _ in range(args.viewers)]
+    for p in procs:
+        p.start()
+    time.sleep(1)  # Let the browsers connect
+    api = []
+    threading.Thread(target=probe, args=(base + '/status', api, stop), daemon=True).start()
+    for p in procs:
+        p.join()
+    stop.set()
+    loaded = np.array(ticks) * 1000
+    fps = [result.get() / args.seconds for _ in procs]
+
+    print(f"Server mode: {args.mode}, viewers: {args.viewers}, duration: {args.seconds} s")
+    for name, t in [('no viewers', baseline), (f'{args.viewers} viewers', loaded)]:
+        p50, p95 = np.percentile(t, [50, 95])
+        print(f"Control tick with {name}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {t.max():.1f} ms ({len(t)} ticks)")
+    print(f"Viewer frame rate: min {min(fps):.1f} fps, mean {np.mean(fps):.1f} fps")
+    answered = np.array([t for t in api if t is not None]) * 1000
+    if len(answered):
+        print(f"API request with {args.viewers} browsers: p50 {np.percentile(answered, 50):.1f} ms, "
+              f"max {answered.max():.1f} ms, {len(api) - len(answered)}/{len(api)} timed out")
+    else:
+        print(f"API request with {args.viewers} browsers: all {len(api)} timed out")
+    print(f"Broadcaster: {broadcaster.stats()}")
+
+
+
+
+if __name__ == '__main__':
+    main()
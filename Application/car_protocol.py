@@ -0,0 +1,162 @@
+"""
+Car Command Protocol,
+Date: 2026-10-19,
+Description: Framing of the command socket to the car. The ESP32 forwards every reply of the Arduino board as a '{<H>_<value>}' frame and sends an unsolicited '{Heartbeat}' frame every second. TCP does not keep those frames apart: one recv() can return half a frame, several frames, or a heartbeat in front of a reply. The channel keeps a byte buffer, decodes it incrementally (a UTF-8 character split between two reads is completed on the next one), cuts it into frames, drops heartbeats and matches each reply to its command by the H id. Replies to other commands are kept until they are asked for, and replies to older commands are discarded. A command without a reply within the timeout is sent again with the same id, because every command of the car sets a state or reads a sensor.
+"""
+
+
+
+
+# Load modules
+import json  # JSON encoding of the commands
+import time  # Deadlines
+import codecs  # Incremental UTF-8 decoding
+import socket  # Socket timeouts
+import threading  # Lock for the counters
+
+
+
+
+class CommandChannel:
+    """
+    Sends commands to the car and matches its replies.
+
+    Args:
+        timeout (float): Time to wait for a reply before the command is sent again (s).
+        retries (int): Number of times a command is sent again before giving up.
+        size (int): Bytes read per recv().
+        keep (int): Replies to other commands kept while waiting for one.
+    """
+
+    def __init__(self, timeout=1.0, retries=2, size=1024, keep=32):
+        self.timeout = timeout
+        self.retries = retries
+        self.size = size
+        self.keep = keep
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.text = ''        # Decoded text not framed yet
+        self.replies = {}     # Replies waiting to be read, by command id
+        self.sent = 0
+        self.received = 0
+        self.heartbeats = 0   # Unsolicited heartbeat frames dropped
+        self.garbage = 0      # Frames that are neither a reply nor a heartbeat
+        self.stale = 0        # Replies to commands that were no longer waited for
+        self.resent = 0       # Commands sent again after a timeout
+        self.failed = 0       # Commands that never got a reply
+        self.lock = threading.Lock()
+
+    def send(self, sock, msg):
+        """
+        Sends a command message, a dictionary with its id in "H".
+        """
+        sock.sendall(json.dumps(msg).encode())
+        with self.lock:
+            self.sent += 1
+
+    def feed(self, data):
+        """
+        Adds received bytes and stores the complete replies they finish.
+        """
+        self.text += self.decoder.decode(data)
+        while True:
+            end = self.text.find('}')
+            if end < 0:
+                start = self.text.find('{')
+                if start != 0 and self.text[:start].strip():
+                    self.garbage += 1  # Bytes outside any frame
+                self.text = self.text[start:] if start >= 0 else ''
+                return
+
+            # Take the last opening brace before the end, so a frame cut short is dropped
+            start = self.text.rfind('{', 0, end)
+            if self.text[:max(start, 0)].strip():
+                self.garbage += 1
+            body, self.text = self.text[start + 1:end], self.text[end + 1:]
+            if start < 0:
+                self.garbage += 1
+            elif body == 'Heartbeat':
+                self.heartbeats += 1
+            elif '_' in body:
+                cmd_id, value = body.split('_', 1)
+                self.replies[cmd_id] = value
+                self.received += 1
+                if len(self.replies) > self.keep:
+                    del self.replies[next(iter(self.replies))]  # Oldest first
+                    self.stale += 1
+            else:
+                self.garbage += 1
+
+    def read(self, sock, cmd_id, timeout):
+        """
+        Waits for the reply to one command.
+
+        Returns:
+            value (str): Text of the reply after the id, e.g. 'ok' or '25'.
+
+        Raises:
+            TimeoutError: No reply within the timeout.
+            ConnectionError: The car closed the connection.
+        """
+        cmd_id = str(cmd_id)
+        deadline = time.monotonic() + timeout
+        while cmd_id not in self.replies:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No reply to command {cmd_id}")
+            sock.settimeout(remaining)
+            try:
+                data = sock.recv(self.size)
+            except socket.timeout:
+                continue  # Checked against the deadline above
+            if not data:
+                raise ConnectionError('The car closed the connection')
+            self.feed(data)
+
+        # Replies to older commands will never be read
+        value = self.replies.pop(cmd_id)
+        if cmd_id.isdigit():
+            for old in [k for k in self.replies if k.isdigit() and int(k) < int(cmd_id)]:
+                del self.replies[old]
+                self.stale += 1
+        return value
+
+    def request(self, sock, msg, sent=False):
+        """
+        Sends a command and returns its reply, sending it again after each timeout.
+
+        Args:
+            sent (bool): The command was already sent (e.g. pipelined), only wait for its reply before the first retry.
+
+        Raises:
+            TimeoutError: No reply after all the retries.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self.lock:
+                    self.resent += 1
+            if attempt or not sent:
+                self.send(sock, msg)
+            try:
+                return self.read(sock, msg["H"], self.timeout)
+            except TimeoutError:
+                continue
+        with self.lock:
+            self.failed += 1
+        raise TimeoutError(f"No reply to command {msg['H']} after {self.retries} retries")
+
+    def stats(self):
+        """
+        Returns the channel counters as a dictionary.
+        """
+        with self.lock:
+            return {
+                'sent': self.sent,
+                'received': self.received,
+                'heartbeats': self.heartbeats,
+                'garbage': self.garbage,
+                'stale': self.stale,
+                'resent': self.resent,
+                'failed': self.failed,
+                'waiting': len(self.replies),
+                'buffered': len(self.text),
+            }
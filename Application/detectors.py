@@ -0,0 +1,229 @@
+"""
+Learned Ball Detector,
+Date: 2026-10-19,
+Description: CPU inference of a small detection model (e.g. a YOLO nano model exported to ONNX) as an alternative to the HSV color filter of capture(). A detector returns the boxes found in a frame as (x, y, w, h, score) tuples in frame pixels, or None when it cannot answer in time, and capture() then uses the HSV filter for that frame. The model runs in a worker thread on OpenCV DNN or ONNX Runtime (optional, pip install onnxruntime) with a configurable thread count. Frames submitted by the control loop and by the background capture thread are batched into one forward pass. When a frame is not answered within the frame budget, the detector reports that it cannot keep up and capture() stays on HSV for a cooldown before the model is tried again.
+"""
+
+
+
+
+# Load modules
+import time  # Latency and cooldown
+import queue  # Frames waiting for the worker
+import threading  # Worker thread and result events
+import cv2 as cv  # OpenCV DNN and blob preparation
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+class Pending:
+    """
+    A frame submitted to the detector and, once set, its boxes.
+    """
+
+    def __init__(self, img):
+        self.img = img
+        self.submitted = time.monotonic()
+        self.finished = None  # Time the result was set
+        self.boxes = None     # List of (x, y, w, h, score), None if the frame was dropped
+        self.failed = False   # Dropped before inference or the forward pass raised
+        self.done = threading.Event()
+
+class DnnDetector:
+    """
+    Batched CPU inference of a detection model in a worker thread.
+
+    Args:
+        model (str): Path of the ONNX model.
+        backend (str): 'opencv' for OpenCV DNN or 'onnxruntime'.
+        threads (int): Inference threads. OpenCV applies it to the whole process, ONNX Runtime to the session.
+        batch (int): Largest number of frames per forward pass. Most exported models have a fixed batch of 1, use more only with a dynamic batch axis.
+        size (tuple): Input width and height of the model.
+        layout (str): 'yolov8' for (batch, 4 + classes, boxes) outputs, 'yolov5' for (batch, boxes, 5 + classes).
+        class_id (int): Class of the ball (32 is 'sports ball' in COCO), or None for the best class.
+        conf (float): Smallest score of a box.
+        nms (float): Overlap above which the weaker of two boxes is suppressed.
+        budget (float): Longest wait for a result before capture() uses HSV, normally the frame interval (s).
+        cooldown (float): Time on HSV after a late result before the model is tried again (s).
+        gather (float): Longest wait for more frames to fill a batch (s).
+    """
+
+    def __init__(self, model, backend='opencv', threads=2, batch=1, size=(320, 320), layout='yolov8',
+                 class_id=32, conf=0.4, nms=0.45, budget=0.1, cooldown=5.0, gather=0.005):
+        self.backend = backend
+        self.batch = batch
+        self.size = size
+        self.layout = layout
+        self.class_id = class_id
+        self.conf = conf
+        self.nms = nms
+        self.budget = budget
+        self.cooldown = cooldown
+        self.gather = gather
+        if backend == 'onnxruntime':
+            import onnxruntime as ort  # Only needed for this backend
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(model, options, providers=['CPUExecutionProvider'])
+            self.input = self.session.get_inputs()[0].name
+            if self.session.get_inputs()[0].shape[0] == 1:
+                self.batch = 1  # Exported with a fixed batch, a larger one would fail every pass
+        else:
+            cv.setNumThreads(threads)
+            self.net = cv.dnn.readNetFromONNX(model)
+            self.net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+        self.queue = queue.Queue(maxsize=2 * self.batch)  # Bounded, the oldest frame is dropped
+        self.latency = None    # Moving average from submit to result (s)
+        self.late_at = None    # Time of the last result that missed the budget
+        self.frames = 0        # Frames inferred
+        self.batches = 0       # Forward passes
+        self.dropped = 0       # Frames dropped before inference
+        self.late = 0          # Results that missed the budget
+        self.failed = 0        # Frames answered without boxes, dropped or failed
+        self.fallbacks = 0     # Frames handed back to HSV
+        self.errors = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.work, daemon=True).start()
+
+    def submit(self, img):
+        """
+        Queues a frame without waiting.
+
+        Returns:
+            pending (Pending): Set when the frame was inferred or dropped.
+        """
+        pending = Pending(img)
+        while True:
+            try:
+                self.queue.put_nowait(pending)
+                return pending
+            except queue.Full:
+                try:
+                    old = self.queue.get_nowait()  # Keep the newest frames
+                except queue.Empty:
+                    continue
+                with self.lock:
+                    self.dropped += 1
+                old.failed = True
+                old.done.set()
+
+    def keeping_up(self):
+        """
+        Tells whether the model may be used: no result missed the budget during the cooldown.
+        """
+        with self.lock:
+            return self.late_at is None or time.monotonic() - self.late_at >= self.cooldown
+
+    def detect(self, img):
+        """
+        Detects boxes in a frame within the budget.
+
+        Returns:
+            boxes (list): (x, y, w, h, score) tuples sorted by score, or None to use the HSV filter.
+        """
+        if not self.keeping_up():
+            with self.lock:
+                self.fallbacks += 1
+            return None
+        pending = self.submit(img)
+        if not pending.done.wait(self.budget):
+            with self.lock:
+                self.late += 1
+                self.fallbacks += 1
+                self.late_at = time.monotonic()
+            return None
+        if pending.failed:
+            with self.lock:
+                self.failed += 1  # Not slow, the dropped frames and errors have their own counters
+                self.fallbacks += 1
+            return None
+        return pending.boxes
+
+    def work(self):
+        """
+        Worker loop: gathers a batch, runs the model and hands out the results.
+        """
+        while True:
+            items = [self.queue.get()]
+            deadline = time.monotonic() + self.gather
+            while len(items) < self.batch:
+                try:
+                    items.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                results = self.infer([p.img for p in items])
+            except Exception:
+                results = [None] * len(items)
+                for p in items:
+                    p.failed = True
+                with self.lock:
+                    self.errors += 1
+            now = time.monotonic()
+            with self.lock:
+                self.frames += len(items)
+                self.batches += 1
+                for p in items:
+                    dt = now - p.submitted
+                    self.latency = dt if self.latency is None else self.latency + 0.2 * (dt - self.latency)
+            for p, boxes in zip(items, results):
+                p.boxes, p.finished = boxes, now
+                p.done.set()
+
+    def infer(self, images):
+        """
+        Runs one forward pass over a batch of frames of the same size.
+
+        Returns:
+            results (list): The boxes of each frame.
+        """
+        blob = cv.dnn.blobFromImages(images, 1 / 255.0, self.size, swapRB=True, crop=False)
+        if self.backend == 'onnxruntime':
+            out = self.session.run(None, {self.input: blob})[0]
+        else:
+            self.net.setInput(blob)
+            out = self.net.forward()
+        h, w = images[0].shape[:2]
+        return [self.boxes(out[n], w / self.size[0], h / self.size[1]) for n in range(len(images))]
+
+    def boxes(self, pred, sx, sy, top=5):
+        """
+        Decodes the output of one frame into boxes in frame pixels.
+        """
+        if self.layout == 'yolov8':
+            pred = pred.T                    # Boxes x (cx, cy, w, h, class scores)
+            cls = pred[:, 4:]
+        else:
+            cls = pred[:, 5:] * pred[:, 4:5]  # Class scores times objectness
+        scores = cls[:, self.class_id] if self.class_id is not None else cls.max(axis=1)
+        keep = np.flatnonzero(scores >= self.conf)
+        cx, cy, bw, bh = pred[keep, :4].T
+        rects = np.stack([(cx - bw / 2) * sx, (cy - bh / 2) * sy, bw * sx, bh * sy], axis=1)
+
+        # Overlapping boxes of the same ball are merged before the best ones are kept
+        picked = np.array(cv.dnn.NMSBoxes(rects.tolist(), scores[keep].tolist(), self.conf, self.nms), dtype=int).reshape(-1)
+        picked = picked[np.argsort(scores[keep][picked])[::-1][:top]]
+        return [(int(x), int(y), int(w), int(h), float(scores[keep][i])) for i, (x, y, w, h) in zip(picked, rects[picked])]
+
+    def stats(self):
+        """
+        Returns the detector counters as a dictionary.
+        """
+        with self.lock:
+            return {
+                'backend': self.backend,
+                'batch': self.batch,
+                'frames': self.frames,
+                'batches': self.batches,
+                'frames_per_batch': round(self.frames / self.batches, 2) if self.batches else None,
+                'latency': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'budget': round(self.budget * 1000, 1),
+                'dropped': self.dropped,
+                'late': self.late,
+                'failed': self.failed,
+                'fallbacks': self.fallbacks,
+                'errors': self.errors,
+            }
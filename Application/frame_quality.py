@@ -0,0 +1,98 @@
+"""
+Frame Quality Gate,
+Date: 2026-10-19,
+Description: Cheap pre-filter that runs before the color detection pipeline. Each frame is reduced to a small grayscale thumbnail, which is used to measure sharpness (variance of the Laplacian) and to compare against the previous frame. A frame is a duplicate when almost no thumbnail pixel changed by more than a per-pixel threshold, so a small object entering a static scene still counts as a change. A frame is blurred when its sharpness falls well below the running median of the recent frames, so the threshold follows the texture of the scene. Frames smeared by the car's own rotation and frames that are identical to the previous one are dropped before the blur, HSV, morphology and contour stages, and the number of skipped frames is kept in counters.
+"""
+
+
+
+
+# Load modules
+import threading  # Lock for the shared counters
+from collections import deque  # Recent sharpness values
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+class FrameGate:
+    """
+    Decides whether a decoded frame is worth running through the full detection pipeline.
+
+    Args:
+        blur_ratio (float): Fraction of the median sharpness of the recent frames below which a frame is treated as motion blur.
+        history (int): Number of recent frames in the sharpness median.
+        pixel_min (int): Gray level change of a thumbnail pixel that counts as changed.
+        changed_max (float): Largest fraction of changed pixels for a frame to be a duplicate of the previous one.
+        size (tuple): Width and height of the thumbnail used for both checks.
+    """
+
+    def __init__(self, blur_ratio=0.5, history=30, pixel_min=12, changed_max=0.0002, size=(160, 120)):
+        self.blur_ratio = blur_ratio
+        self.pixel_min = pixel_min
+        self.changed_max = changed_max
+        self.size = size
+        self.sharpness = deque(maxlen=history)  # Laplacian variance of the recent frames
+        self.prev = None      # Thumbnail of the last accepted frame
+        self.checked = 0      # Frames seen by the gate
+        self.blurred = 0      # Frames dropped for motion blur
+        self.duplicate = 0    # Frames dropped as duplicates of the previous one
+        self.last_sharpness = 0.0
+        self.lock = threading.Lock()
+
+    def thumbnail(self, img):
+        """
+        Reduces a BGR frame to the small grayscale image used by the checks.
+        """
+        small = cv.resize(img, self.size, interpolation=cv.INTER_AREA)  # Area averaging keeps it cheap and stable
+        return cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+
+    def check(self, img):
+        """
+        Classifies a frame.
+
+        Args:
+            img (numpy.ndarray): Decoded BGR frame.
+
+        Returns:
+            verdict (str): 'ok' if the frame should be processed, 'blurred' or 'duplicate' otherwise.
+        """
+        thumb = self.thumbnail(img)
+        sharpness = cv.Laplacian(thumb, cv.CV_16S).var()  # Variance of the Laplacian as a focus measure
+
+        with self.lock:
+            self.checked += 1
+            self.last_sharpness = float(sharpness)
+            self.sharpness.append(self.last_sharpness)
+
+            # Same picture as before, the detection result cannot change
+            if self.prev is not None:
+                changed = np.count_nonzero(cv.absdiff(thumb, self.prev) > self.pixel_min) / thumb.size
+                if changed <= self.changed_max:
+                    self.duplicate += 1
+                    return 'duplicate'
+
+            # Smeared frame, contours and centroids would be unreliable
+            if len(self.sharpness) >= 5 and sharpness < self.blur_ratio * np.median(self.sharpness):
+                self.blurred += 1
+                return 'blurred'
+
+            self.prev = thumb
+            return 'ok'
+
+    def stats(self):
+        """
+        Returns the gate counters as a dictionary.
+        """
+        with self.lock:
+            skipped = self.blurred + self.duplicate
+            return {
+                'checked': self.checked,
+                'blurred': self.blurred,
+                'duplicate': self.duplicate,
+                'skipped': skipped,
+                'processed': self.checked - skipped,
+                'last_sharpness': round(self.last_sharpness, 1),
+                'median_sharpness': round(float(np.median(self.sharpness)), 1) if self.sharpness else None,
+            }
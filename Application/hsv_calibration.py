@@ -0,0 +1,181 @@
+"""
+HSV Calibration,
+Date: 2026-10-19,
+Description: Computes HSV thresholds for the ball from pixels sampled in a region of a live frame and keeps them as named profiles on disk. Bounds come from the dominant hue of a circular hue histogram and percentiles of the pixels around it, so a stray highlight or a guide line in the sample does not widen the range. Ranges that wrap around red (hue 0/180) are split in two, following the "red"/"red2" naming used by the trackers. A profile store watches the file on disk and hands back only the colors whose bounds changed, so the detector can update its thresholds in place.
+"""
+
+
+
+
+# Load modules
+import os  # File paths and modification times
+import json  # Profile serialization
+import time  # Time-related functions
+import threading  # Lock for the profile store
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+def sample_region(img, x, y, w, h):
+    """
+    Returns the HSV pixels inside a rectangle of a BGR frame.
+
+    Args:
+        img (numpy.ndarray): Decoded BGR frame.
+        x, y (int): Top-left corner of the region.
+        w, h (int): Width and height of the region.
+
+    Returns:
+        pixels (numpy.ndarray): N x 3 array of HSV values.
+    """
+    roi = img[max(0, y):y + h, max(0, x):x + w]
+    roi = cv.medianBlur(roi, 5)                   # Same smoothing as the detection pipeline
+    hsv = cv.cvtColor(roi, cv.COLOR_BGR2HSV)
+    return hsv.reshape(-1, 3)
+
+def compute_bounds(pixels, name, low=5, high=95, hue_window=15, sat_min=40, margin=(4, 20, 20)):
+    """
+    Computes robust HSV bounds for a sample of ball pixels.
+
+    Args:
+        pixels (numpy.ndarray): N x 3 array of HSV values.
+        name (str): Color name; a wrapped red range adds a second entry named name + '2'.
+        low, high (float): Percentiles used as the lower and upper bounds.
+        hue_window (int): Half width of the hue band kept around the histogram peak.
+        sat_min (int): Pixels below this saturation are ignored, their hue is noise.
+        margin (tuple): Extra room added on each side for H, S and V.
+
+    Returns:
+        ranges (dict): Color name to (lower, upper) uint8 arrays, like color_ranges.
+    """
+    pixels = pixels[pixels[:, 1] >= sat_min]
+    if len(pixels) == 0:
+        raise ValueError("No saturated pixels in the sampled region")
+
+    # Dominant hue from a circularly smoothed histogram
+    hue = pixels[:, 0].astype(np.int16)
+    hist = np.bincount(hue, minlength=180)[:180]
+    hist = np.convolve(np.concatenate([hist[-2:], hist, hist[:2]]), np.ones(5), 'valid')
+    peak = int(np.argmax(hist))
+
+    # Center the hue on the peak so that red does not split across 0/180
+    shifted = (hue - peak + 90) % 180
+    keep = np.abs(shifted - 90) <= hue_window
+    shifted = shifted[keep]
+    pixels = pixels[keep]
+
+    h_lo, h_hi = np.percentile(shifted, [low, high]) + peak - 90
+    s_lo, s_hi = np.percentile(pixels[:, 1], [low, high])
+    v_lo, v_hi = np.percentile(pixels[:, 2], [low, high])
+    h_lo, h_hi = int(h_lo) - margin[0], int(np.ceil(h_hi)) + margin[0]
+    s_lo, v_lo = max(0, int(s_lo) - margin[1]), max(0, int(v_lo) - margin[2])
+    s_hi, v_hi = min(255, int(s_hi) + margin[1]), min(255, int(v_hi) + margin[2])
+
+    def bounds(lo, hi):
+        return (np.array([lo, s_lo, v_lo], dtype="uint8"), np.array([hi, s_hi, v_hi], dtype="uint8"))
+
+    # Split the range in two when it wraps around hue 0/180
+    if h_lo < 0:
+        return {name: bounds(0, h_hi), name + '2': bounds(180 + h_lo, 180)}
+    if h_hi > 180:
+        return {name: bounds(0, h_hi - 180), name + '2': bounds(h_lo, 180)}
+    return {name: bounds(h_lo, h_hi)}
+
+def apply_ranges(color_ranges, ranges):
+    """
+    Updates a color_ranges dictionary in place with new bounds.
+
+    Returns:
+        changed (list): Names of the colors whose bounds actually changed.
+    """
+    changed = []
+    for name, (lower, upper) in ranges.items():
+        old = color_ranges.get(name)
+        if old is None or not (np.array_equal(old[0], lower) and np.array_equal(old[1], upper)):
+            color_ranges[name] = (lower, upper)
+            changed.append(name)
+    return changed
+
+
+
+
+class ProfileStore:
+    """
+    Named HSV profiles saved as JSON files in a directory.
+
+    Args:
+        directory (str): Folder holding one <name>.json file per profile.
+        name (str): Profile that is loaded and watched.
+        interval (float): Minimum time between checks of the file on disk.
+    """
+
+    def __init__(self, directory, name, interval=1.0):
+        self.directory = directory
+        self.name = name
+        self.interval = interval
+        self.mtime = None       # Modification time of the profile last loaded
+        self.checked_at = 0.0   # Last time the file was checked
+        self.error = None       # Why the last load failed, the previous ranges are kept
+        self.lock = threading.Lock()
+
+    def path(self, name=None):
+        return os.path.join(self.directory, (name or self.name) + '.json')
+
+    def load(self, name=None):
+        """
+        Reads a profile from disk.
+
+        Returns:
+            ranges (dict): Color name to (lower, upper) arrays, empty if the profile does not exist or cannot be read.
+        """
+        try:
+            with open(self.path(name)) as f:
+                data = json.load(f)
+            return {
+                color: (np.array(lower, dtype="uint8"), np.array(upper, dtype="uint8"))
+                for color, (lower, upper) in data.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError, ValueError, TypeError, AttributeError) as e:
+            self.error = f"Cannot read HSV profile {self.path(name)}: {e}"  # Hand-edited or half-written file
+            return {}
+
+    def save(self, ranges, name=None):
+        """
+        Merges the given ranges into a profile and writes it atomically.
+        """
+        with self.lock:
+            data = {
+                color: [lower.tolist(), upper.tolist()]
+                for color, (lower, upper) in {**self.load(name), **ranges}.items()
+            }
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.path(name) + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp, self.path(name))  # Readers never see a half-written file
+
+    def poll(self, color_ranges):
+        """
+        Applies the watched profile to color_ranges if the file changed since the last call.
+
+        Returns:
+            changed (list): Names of the colors that were updated.
+        """
+        self.error = None  # Only reported by the call that loaded the file
+        now = time.monotonic()
+        if now - self.checked_at < self.interval:
+            return []
+        self.checked_at = now
+
+        try:
+            mtime = os.stat(self.path()).st_mtime
+        except FileNotFoundError:
+            return []
+        if mtime == self.mtime:
+            return []
+        self.mtime = mtime
+        return apply_ranges(color_ranges, self.load())
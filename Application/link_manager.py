@@ -0,0 +1,160 @@
+"""
+WiFi Link Manager,
+Date: 2026-10-19,
+Description: Shares the ESP32 soft-AP link between camera fetches and the port-100 command socket. It measures round-trip time on the command channel, and fetch time and throughput on the camera channel. Commands get priority in two ways. During critical maneuvers (stops and closed-loop turns), background frame fetches are paused until the maneuver ends, or for at most max_pause so a section left open by mistake cannot freeze the stream. A fetch already in flight cannot be aborted, so the pause is also held ahead of time while an obstacle is close enough that a stop may follow. When command replies slow down, the background frame rate is lowered. The measurements are exposed as link-quality metrics.
+"""
+
+
+
+
+# Load modules
+import time  # Monotonic timestamps
+import threading  # Events and locks
+import numpy as np  # Percentiles
+from collections import deque  # Recent samples
+from contextlib import contextmanager  # Critical sections
+from urllib.request import urlopen  # To fetch images from a URL
+
+
+
+
+class LinkManager:
+    """
+    Measures both channels of the car link and arbitrates camera traffic.
+
+    Args:
+        interval (float): Background frame interval when the link is healthy.
+        max_interval (float): Longest background frame interval when commands are slow.
+        rtt_target (float): Command round-trip time considered healthy, in seconds.
+        alpha (float): Smoothing factor of the moving averages.
+        max_pause (float): Longest wait of a background fetch for critical sections to end, in seconds.
+    """
+
+    def __init__(self, interval=0.1, max_interval=1.0, rtt_target=0.05, alpha=0.2, max_pause=5.0):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.rtt_target = rtt_target
+        self.alpha = alpha
+        self.max_pause = max_pause
+        self.cmd_rtt = None        # Moving average of command round-trip time
+        self.fetch_time = None     # Moving average of camera fetch time
+        self.throughput = None     # Moving average of camera throughput in bytes/s
+        self.rtts = deque(maxlen=200)
+        self.commands = 0
+        self.fetches = 0
+        self.paused = 0            # Background fetches that waited for a maneuver
+        self.overrun = 0           # Background fetches that gave up waiting after max_pause
+        self.critical_depth = 0    # Nesting level of critical sections
+        self.critical_time = 0.0   # Total time spent in critical sections
+        self.critical_start = None # Start of the outermost critical section
+        self.held = False          # Critical section held open by hold()
+        self.clear = threading.Event()
+        self.clear.set()
+        self.lock = threading.Lock()
+
+    def average(self, old, new):
+        return new if old is None else old + self.alpha * (new - old)
+
+    def record_command(self, rtt):
+        """
+        Records the round-trip time of a command, from send to reply.
+        """
+        with self.lock:
+            self.commands += 1
+            self.cmd_rtt = self.average(self.cmd_rtt, rtt)
+            self.rtts.append(rtt)
+
+    def enter(self):
+        with self.lock:
+            if self.critical_depth == 0:
+                self.critical_start = time.monotonic()
+            self.critical_depth += 1
+            self.clear.clear()
+
+    def leave(self):
+        with self.lock:
+            self.critical_depth -= 1
+            if self.critical_depth == 0:
+                self.critical_time += time.monotonic() - self.critical_start
+                self.clear.set()
+
+    @contextmanager
+    def critical(self):
+        """
+        Context manager for maneuvers whose commands must not wait behind a frame transfer.
+        Background fetches stay paused for the whole lifetime of the context.
+        """
+        self.enter()
+        try:
+            yield
+        finally:
+            self.leave()
+
+    def hold(self, active):
+        """
+        Holds a critical section open while active is True, e.g. while an obstacle is close, so that
+        no frame transfer is in flight when the stop is sent. Calls with the same value do nothing.
+        """
+        with self.lock:
+            if active == self.held:
+                return
+            self.held = active
+        if active:
+            self.enter()
+        else:
+            self.leave()
+
+    def fetch(self, url, background=True):
+        """
+        Fetches a camera frame and records its timing.
+
+        Args:
+            url (str): Camera capture URL.
+            background (bool): Background fetches wait for critical maneuvers to end, at most max_pause;
+                the control loop fetching its own frame does not.
+
+        Returns:
+            data (bytes): JPEG bytes of the frame.
+        """
+        if background and not self.clear.is_set():
+            self.paused += 1
+            if not self.clear.wait(self.max_pause):  # Until the last critical section ends
+                self.overrun += 1  # Left open too long, keep the stream alive
+
+        start = time.monotonic()
+        data = urlopen(url).read()
+        elapsed = time.monotonic() - start
+        with self.lock:
+            self.fetches += 1
+            self.fetch_time = self.average(self.fetch_time, elapsed)
+            self.throughput = self.average(self.throughput, len(data) / max(elapsed, 1e-6))
+        return data
+
+    def camera_interval(self):
+        """
+        Returns the pause before the next background fetch, stretched when command replies are slow.
+        """
+        if self.cmd_rtt is None or self.cmd_rtt <= self.rtt_target:
+            return self.interval
+        return min(self.max_interval, self.interval * self.cmd_rtt / self.rtt_target)
+
+    def stats(self):
+        """
+        Returns the link-quality metrics as a dictionary, times in milliseconds.
+        """
+        with self.lock:
+            rtts = np.array(self.rtts) * 1000
+            return {
+                'commands': self.commands,
+                'cmd_rtt_avg': round(self.cmd_rtt * 1000, 1) if self.cmd_rtt is not None else None,
+                'cmd_rtt_p95': round(float(np.percentile(rtts, 95)), 1) if len(rtts) else None,
+                'fetches': self.fetches,
+                'fetch_time_avg': round(self.fetch_time * 1000, 1) if self.fetch_time is not None else None,
+                'throughput_kbps': round(self.throughput * 8 / 1000, 1) if self.throughput is not None else None,
+                'camera_interval': round(self.camera_interval() * 1000, 1),
+                'critical': self.critical_depth > 0,
+                'held': self.held,
+                'critical_time': round(self.critical_time, 2),
+                'paused_fetches': self.paused,
+                'overrun_pauses': self.overrun,
+            }
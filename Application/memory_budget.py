@@ -0,0 +1,104 @@
+"""
+Memory Budget,
+Date: 2026-10-19,
+Description: Keeps the memory of the robot application bounded on a 1 GB Raspberry Pi. The camera thread used to keep a new full-resolution copy of every frame for the stream and the calibration route, and the old copies were only freed by the garbage collector. With MEMORY_BUDGET=1 the retained frame is written into a small ring of preallocated buffers at reduced resolution (and in grayscale with MEMORY_GRAY=1), so the retained frames occupy a fixed number of bytes after the first frame. Detection still runs on the full decoded frame, which is dropped as soon as capture() returns. The process RSS is read from /proc for the reporting endpoint.
+"""
+
+
+
+
+# Load modules
+import resource  # Peak RSS where /proc is not available
+import threading  # Lock for the ring position
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+class FramePool:
+    """
+    Fixed ring of frame buffers for the frames kept after detection.
+
+    Args:
+        slots (int): Number of buffers. A frame stays valid until `slots - 1` newer frames have been retained.
+        scale (float): Resolution of the retained frames relative to the camera frames.
+        gray (bool): Retain single-channel grayscale frames instead of color.
+    """
+
+    def __init__(self, slots=3, scale=0.5, gray=False):
+        self.slots = slots
+        self.scale = scale
+        self.gray = gray
+        self.buffers = [None] * slots  # Allocated on the first frame of each size
+        self.small = None              # Scratch buffer for the color resize before the grayscale conversion
+        self.next = 0
+        self.retained = 0              # Frames written into the pool
+        self.allocations = 0           # Buffers (re)allocated, stays at the slot count for a fixed camera size
+        self.lock = threading.Lock()
+
+    def retain(self, img):
+        """
+        Copies a frame into the next buffer of the ring at the pool resolution.
+
+        Returns:
+            frame (numpy.ndarray): The retained frame, a view of a pool buffer.
+        """
+        h, w = img.shape[:2]
+        size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+        shape = (size[1], size[0]) if self.gray else (size[1], size[0], img.shape[2])
+        with self.lock:
+            n, self.next = self.next, (self.next + 1) % self.slots
+            if self.buffers[n] is None or self.buffers[n].shape != shape:
+                self.buffers[n] = np.empty(shape, dtype=img.dtype)
+                self.allocations += 1
+            self.retained += 1
+        out = self.buffers[n]
+
+        if not self.gray:
+            cv.resize(img, size, dst=out, interpolation=cv.INTER_AREA)
+        else:
+            if self.small is None or self.small.shape[:2] != shape:
+                self.small = np.empty((size[1], size[0], img.shape[2]), dtype=img.dtype)
+            cv.resize(img, size, dst=self.small, interpolation=cv.INTER_AREA)
+            cv.cvtColor(self.small, cv.COLOR_BGR2GRAY, dst=out)
+        return out
+
+    def stats(self):
+        """
+        Returns the occupancy of the pool as a dictionary.
+        """
+        with self.lock:
+            used = [b for b in self.buffers if b is not None]
+            return {
+                'slots': self.slots,
+                'used': len(used),
+                'bytes': sum(b.nbytes for b in used) + (self.small.nbytes if self.small is not None else 0),
+                'shape': list(used[0].shape) if used else None,
+                'retained': self.retained,
+                'allocations': self.allocations,
+            }
+
+
+
+
+def memory_stats():
+    """
+    Returns the resident set size of the process and its peak, in MB.
+    """
+    rss = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) / 1024  # Reported in kB
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+    return {
+        'rss_mb': round(rss, 1) if rss is not None else None,
+        'peak_mb': round(peak, 1),
+    }
@@ -0,0 +1,163 @@
+"""
+IMU Odometry,
+Date: 2026-10-19,
+Description: Dead reckoning from the MPU6050 readings returned by cmd(car, do='measure', what='motion'). Samples are integrated in batches with NumPy: yaw from the z gyro, and position from the x/y accelerometer rotated by the heading. The sensor offsets start from the static calibration list and are re-estimated online when the car is known to be still: the motors have been off for a hold-off time after the last stop, so braking and the residual yaw are over, and the recent gyro readings vary less than a threshold. Turns can run closed-loop: the motors stop when the integrated heading, extrapolated over one sample interval, reaches the target, and the open-loop time is kept only as a timeout.
+"""
+
+
+
+
+# Load modules
+import time  # Monotonic timestamps
+import threading  # Lock for the shared state
+import numpy as np  # Numerical operations with arrays
+from collections import deque  # Recent yaw rates
+
+
+
+
+ACCEL_LSB = 16384.0  # Raw units per g at the +-2 g range set by the firmware
+GYRO_LSB = 131.0     # Raw units per deg/s at the +-250 deg/s range set by the firmware
+G = 981.0            # Gravity (cm/s^2)
+
+class Odometry:
+    """
+    Heading and position of the car from batches of motion samples.
+
+    Args:
+        off (list): Initial offsets of the six motion values, in the units returned by cmd().
+        alpha (float): Weight of each still batch in the online offset estimate.
+        max_gap (float): Longest time between samples that is still integrated (s).
+        holdoff (float): Time after a stop before the offsets are learned (s).
+        still_std (float): Largest standard deviation of the recent yaw rates for the car to count as still (deg/s).
+    """
+
+    def __init__(self, off, alpha=0.05, max_gap=0.25, holdoff=1.0, still_std=0.5):
+        self.bias = np.array(off, dtype=float)  # Offsets subtracted by cmd(), updated online
+        self.alpha = alpha
+        self.max_gap = max_gap
+        self.holdoff = holdoff
+        self.still_std = still_std
+        self.moving = False       # Set by the command layer from the last motor command
+        self.stopped = 0.0        # Time of the last stop
+        self.still = deque(maxlen=10)  # Yaw rates since the motors were stopped
+        self.learned = 0          # Batches used to update the offsets
+        self.sign_errors = 0      # Turns whose heading change had the wrong sign
+        self.yaw = 0.0            # Heading (degrees, counterclockwise positive, the z gyro axis points up)
+        self.rate = 0.0           # Last yaw rate (deg/s)
+        self.pos = np.zeros(2)    # Position (cm)
+        self.vel = np.zeros(2)    # Velocity (cm/s)
+        self.t = None             # Time of the last sample
+        self.interval = 0.05      # Moving average of the time between samples
+        self.lock = threading.Lock()
+
+    def set_moving(self, moving):
+        """
+        Tells the odometry whether the motors are running, from the last motor command.
+        """
+        with self.lock:
+            if self.moving and not moving:
+                self.stopped = time.monotonic()
+                self.still.clear()
+            self.moving = moving
+
+    def correct(self, values):
+        """
+        Removes the current offset estimate from a motion reading already scaled by cmd().
+        """
+        return [round(values[i] - self.bias[i], 4) for i in range(6)]
+
+    def update(self, samples, times):
+        """
+        Integrates a batch of corrected motion samples.
+
+        Args:
+            samples (array-like): N x 6 readings as returned by cmd() (ax, ay, az, gx, gy, gz).
+            times (array-like): Monotonic time of each reading.
+        """
+        s = np.asarray(samples, dtype=float).reshape(-1, 6)
+        t = np.asarray(times, dtype=float)
+        rate = s[:, 5] * ACCEL_LSB / GYRO_LSB  # cmd() scales every value by 1/16384, gyro included
+
+        with self.lock:
+            if not self.moving:
+                self.still.extend(rate)
+                settled = t[0] - self.stopped >= self.holdoff and len(self.still) >= 5 and np.std(self.still) <= self.still_std
+                if settled:
+                    self.bias += self.alpha * s.mean(axis=0)  # A still car should read zero everywhere
+                    self.learned += 1
+                self.vel[:] = 0.0                         # Zero-velocity update
+
+            # Join the batch to the previous sample unless there was a long gap
+            if self.t is not None and t[0] - self.t <= self.max_gap:
+                t = np.concatenate([[self.t], t])
+                rate = np.concatenate([[self.rate], rate])
+                acc = np.concatenate([s[:1, :2], s[:, :2]]) * G
+            else:
+                acc = s[:, :2] * G
+            dt = np.diff(t)
+            if len(dt):
+                self.interval += 0.2 * (dt.mean() - self.interval)
+
+                # Heading with the trapezoidal rule
+                yaw = self.yaw + np.concatenate([[0.0], np.cumsum(0.5 * (rate[1:] + rate[:-1]) * dt)])
+                self.yaw = float(yaw[-1])
+
+                # Acceleration in the ground frame, integrated twice while the car moves
+                if self.moving:
+                    rad = np.radians(yaw[1:])
+                    c, sn = np.cos(rad), np.sin(rad)
+                    ax, ay = acc[1:, 0], acc[1:, 1]
+                    world = np.stack([ax * c - ay * sn, ax * sn + ay * c], axis=1)
+                    vel = self.vel + np.cumsum(world * dt[:, None], axis=0)
+                    self.pos += (vel * dt[:, None]).sum(axis=0)
+                    self.vel = vel[-1]
+
+            self.t = float(t[-1])
+            self.rate = float(rate[-1])
+
+    def turn(self, start, stop, sample, angle, timeout, batch=2):
+        """
+        Turns the car until the heading changed by the given angle.
+
+        Args:
+            start (callable): Starts the turn (e.g. a move left/right command).
+            stop (callable): Stops the motors.
+            sample (callable): Returns one motion reading from cmd().
+            angle (float): Angle to turn, in degrees.
+            timeout (float): Longest turn time, normally the open-loop estimate with some margin.
+            batch (int): Readings integrated together before the heading is checked.
+
+        Returns:
+            turned (float): Heading change measured when the motors were stopped.
+        """
+        start()
+        yaw0, t0 = self.yaw, time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            readings, times = [], []
+            for _ in range(batch):
+                readings.append(sample())
+                times.append(time.monotonic())
+            self.update(readings, times)
+
+            # Stop one sample early if the current rate would carry the car past the target
+            if abs(self.yaw - yaw0) + abs(self.rate) * self.interval >= abs(angle):
+                break
+        stop()
+        return self.yaw - yaw0
+
+    def stats(self):
+        """
+        Returns the odometry state as a dictionary.
+        """
+        with self.lock:
+            return {
+                'yaw': round(self.yaw, 1),
+                'x': round(float(self.pos[0]), 1),
+                'y': round(float(self.pos[1]), 1),
+                'moving': self.moving,
+                'learned': self.learned,
+                'sign_errors': self.sign_errors,
+                'bias': [round(float(b), 4) for b in self.bias],
+                'interval': round(self.interval * 1000, 1),
+            }
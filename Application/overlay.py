@@ -0,0 +1,90 @@
+"""
+Frame Overlay,
+Date: 2026-10-19,
+Description: Draws annotations onto the video stream instead of the frames used for detection. The detection code stores its result as lightweight vector data (the ball contour, its center and a label). The streaming layer composites it onto a copy of the frame only when it is about to encode that frame for at least one viewer. The horizon and center lines are two cv.line calls on that copy, which costs far less than a masked assignment over the whole frame. Detection and streaming use different camera fetches, so the result carries the fetch time of its frame and is only drawn on streamed frames fetched close to it.
+"""
+
+
+
+
+# Load modules
+import time  # Age of the detection result
+import threading  # Lock shared by the control loop and the streaming worker
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+class Overlay:
+    """
+    Latest detection result as vector data, and the compositor that draws it.
+
+    Args:
+        yh (int): Y-coordinate of the horizon line, from the image bottom.
+        color (tuple): BGR color of the annotations.
+        max_age (float): Time after which a detection is no longer drawn on frames without a fetch time.
+        max_skew (float): Largest time between the fetches of the detection frame and the streamed frame.
+        scale (float): Size of the streamed frames relative to the frames used for detection.
+    """
+
+    def __init__(self, yh=491, color=(0, 0, 255), max_age=1.0, max_skew=0.15, scale=1.0):
+        self.yh = yh
+        self.color = color
+        self.max_age = max_age
+        self.max_skew = max_skew
+        self.scale = scale
+        self.contour = None   # Points of the selected contour
+        self.center = None    # Center of the ball in image coordinates
+        self.label = ''       # Text drawn next to the center
+        self.stamp = 0.0      # Fetch time of the frame the detection was made in
+        self.lock = threading.Lock()
+
+    def update(self, contour, center, label, stamp=None):
+        """
+        Stores the detection of the last processed frame, with the monotonic time that frame was fetched.
+        """
+        with self.lock:
+            self.contour, self.center, self.label = contour, center, label
+            self.stamp = time.monotonic() if stamp is None else stamp
+
+    def clear(self):
+        """
+        Forgets the detection, e.g. when no ball was found.
+        """
+        with self.lock:
+            self.contour = None
+
+    def compose(self, img, stamp=None):
+        """
+        Draws the guide lines and the latest detection on a copy of the frame.
+
+        Args:
+            img (numpy.ndarray): Frame to stream.
+            stamp (float): Monotonic time the frame was fetched, None if unknown.
+
+        Returns:
+            out (numpy.ndarray): Annotated frame; the input frame is left untouched.
+        """
+        out = img.copy()
+        color = self.color if out.ndim == 3 else 255  # White on grayscale frames
+        h, w = out.shape[:2]
+        yh = round(self.yh * self.scale)
+        cv.line(out, (w // 2, 0), (w // 2, h), color, 1)  # Vertical center line
+        cv.line(out, (0, h - yh), (w, h - yh), color, 1)  # Horizon line
+
+        with self.lock:
+            if self.contour is None:
+                return out
+            if stamp is None and time.monotonic() - self.stamp > self.max_age:
+                return out
+            if stamp is not None and abs(stamp - self.stamp) > self.max_skew:
+                return out  # The ball was found in another frame, it may have moved since
+            contour, center, label = self.contour, self.center, self.label
+        if self.scale != 1.0:  # Detection coordinates are in camera pixels
+            contour = (contour * self.scale).astype(np.int32)
+            center = (round(center[0] * self.scale), round(center[1] * self.scale))
+        cv.drawContours(out, [contour], 0, color, 1)  # Highlight the selected contour
+        cv.circle(out, center, 1, color, 2)           # Mark the center of the ball
+        cv.putText(out, label, center, cv.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv.LINE_AA)  # Annotate coordinates
+        return out
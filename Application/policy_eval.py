@@ -0,0 +1,238 @@
+"""
+Policy Evaluation,
+Date: 2026-10-19,
+Description: Replays recorded sessions through parameterized versions of the obstacle evasion and ball search behaviors to tune speed, dist_min, d180 and dturn offline. The front distance readings of every forward run are re-timed for the candidate speed. A run ends at every stop, turn, reverse or head rotation in the command stream, so the approaches on either side of an evasion that drives straight on stay separate. The decision rules from behaviors.py decide when the car stops and which way it evades, using the side distances that were measured on the car at the evasion head angles. The maneuvers are costed like evade_obstacle() and find_ball() run them: evasion turns to the angle of the original turn_s open-loop turn, limited by 1.5 times turn_s, a 0.5 s reverse when both sides are blocked, and closed-loop body turns that end on the IMU heading, at the yaw rate measured in the session, or at their timeout of 1.5 times the open-loop time from d180 or dturn. A turn cut by its timeout is counted as short. Each parameter set is scored by completion time, number of stops, short turns and a collision proxy: stopping with less than a margin of clearance after the command round-trip time recorded in the session. Parameter sets run in parallel over a process pool.
+
+Usage: python policy_eval.py sessions/20261019-101500 --speed 80 100 150 --dist-min 20 30 40 --d180 80 90 --dturn 50 60
+"""
+
+
+
+
+# Load modules
+import argparse  # Command-line arguments
+import itertools  # Parameter grid
+import numpy as np  # Numerical operations with arrays
+from concurrent.futures import ProcessPoolExecutor  # Parallel evaluation
+from session_store import SessionReader  # Recorded sessions
+from behaviors import choose_evasion, turn_time, turn_angle  # Same decision rules as on the car
+
+
+
+
+ROTATE_TIME = 0.5   # Head rotation time of a sweep, find_ball() waits this long after each rotation (s)
+COLLISION = 5.0     # Clearance below which a stop counts as a collision (cm)
+CM_PER_SPEED = 0.3  # Ground speed per unit of motor speed when the session cannot tell (cm/s)
+EVADE_ANG = [90, 45, 135]  # Head angles of evade_obstacle() (center, left, right)
+TURN_S = 0.5        # Open-loop time of an evasion turn, its timeout is 1.5 times longer (s)
+BACK_S = 0.5        # Reverse time of evade_obstacle() (s)
+GYRO_SCALE = 16384 / 131  # cmd() motion units to deg/s for the z gyro
+
+def load(directories):
+    """
+    Extracts what the replay needs from the telemetry and detections of recorded sessions.
+
+    Returns:
+        data (dict): Front distance samples with the forward speed and run number at each one, side distance pairs,
+            ball angles, loop period, command round-trip time, ground speed factor and yaw rate factor.
+    """
+    front, sides, balls, latency, period, yaw_rates = [], [], [], [], [], []
+    run = 0  # Forward run of each front reading, over all sessions
+    for directory in directories:
+        reader = SessionReader(directory)
+        chunks = range(len(reader.chunks))
+        tele = np.concatenate([reader.records('telemetry', n) for n in chunks])
+        det = np.concatenate([reader.records('detections', n) for n in chunks])
+        balls.append(det[det['ball'] == 1][['t', 'ang_deg']])
+        if 'rtt' in tele.dtype.names and np.isfinite(tele['rtt']).any():
+            latency.append(np.nanmedian(tele['rtt']))  # Traced from command send to reply
+        elif len(tele) > 1:
+            latency.append(np.median(np.diff(tele['t'])))  # Sessions recorded before the round trip was kept
+
+        # Follow the head angle and the wheel speeds through the command stream
+        head, speed, turning, side, first = 90, 0.0, 0.0, {}, len(front)
+        run += 1
+        for t, n, d1, d2, res, motion in zip(tele['t'], tele['n'], tele['d1'], tele['d2'], tele['res'], tele['motion']):
+            if n in (1, 5) or (n == 3 and d1 != 3):
+                run += 1  # A stop, head rotation, turn or reverse ends the forward run
+            if n == 5:
+                head = d2
+            elif n == 3:
+                speed = d2 if d1 == 3 else 0.0  # Only forward runs approach obstacles
+                turning = d2 if d1 in (1, 2) else 0.0
+            elif n == 4:
+                speed, turning = (d1 + d2) / 2, 0.0  # Tracking sets both wheel speeds
+            elif n == 1:
+                speed, turning = 0.0, 0.0
+            elif n == 6 and turning > 0 and np.isfinite(motion[5]):
+                yaw_rates.append(abs(motion[5]) * GYRO_SCALE / turning)  # Sampled by a closed-loop turn
+            elif n == 21 and head == EVADE_ANG[0]:
+                front.append((t, res, speed, run))
+            elif n == 21 and head in EVADE_ANG[1:]:
+                side[head] = res  # Paired by head angle, the search scan uses other angles
+                if len(side) == 2:
+                    sides.append((t, side[EVADE_ANG[1]], side[EVADE_ANG[2]]))
+                    side = {}
+
+        times = np.array([f[0] for f in front[first:]])
+        if len(times) > 1:
+            period.append(np.median(np.diff(times)))
+
+    front = np.array(front, dtype=[('t', 'f8'), ('d', 'f4'), ('speed', 'f4'), ('run', 'i4')])
+    front.sort(order='t')
+
+    # Ground speed factor from consecutive readings while driving forward at a constant speed
+    dt, dd = np.diff(front['t']), np.diff(front['d'])
+    same = (front['speed'][1:] > 0) & (front['speed'][1:] == front['speed'][:-1]) & (front['run'][1:] == front['run'][:-1]) & (dd < 0) & (dt < 1)
+    rates = -dd[same] / dt[same] / front['speed'][1:][same]
+    return {
+        'front': front,
+        'sides': np.array(sides, dtype=[('t', 'f8'), ('left', 'f4'), ('right', 'f4')]),
+        'balls': np.concatenate(balls) if balls else np.zeros(0, dtype=[('t', 'f8'), ('ang_deg', 'i2')]),
+        'latency': float(np.mean(latency)) if latency else 0.1,
+        'period': float(np.mean(period)) if period else 0.2,
+        'cm_per_speed': float(np.median(rates)) if len(rates) else CM_PER_SPEED,
+        'deg_per_speed': float(np.median(yaw_rates)) if yaw_rates else None,
+    }
+
+
+
+
+data = None  # Session data of each worker process, set once by init()
+
+def init(shared):
+    global data
+    data = shared
+
+def body_turn(angle, speed, timeout):
+    """
+    Duration of a closed-loop body turn, which ends on the heading or at its timeout.
+
+    Returns:
+        seconds (float): Time the motors turned.
+        short (bool): Whether the timeout ended the turn before the angle was reached.
+    """
+    if data['deg_per_speed'] is None:
+        return timeout / 1.5, False  # No gyro samples of turns, the open-loop estimate is all there is
+    needed = abs(angle) / (data['deg_per_speed'] * speed)
+    return min(needed, timeout), needed > timeout
+
+def simulate(params):
+    """
+    Replays the sessions with one parameter set.
+
+    Args:
+        params (tuple): speed, dist_min, d180 and dturn.
+
+    Returns:
+        result (dict): The parameters with completion time, stops, short turns, collisions and the smallest clearance.
+    """
+    speed, dist_min, d180, dturn = params
+    front, sides, balls = data['front'], data['sides'], data['balls']
+    period, latency = data['period'], data['latency']
+    v = data['cm_per_speed'] * speed  # Ground speed of the candidate (cm/s)
+
+    # Forward runs are the stretches of front readings with a positive recorded speed between two maneuvers
+    moving = np.flatnonzero(front['speed'] > 0)
+    breaks = np.flatnonzero((np.diff(moving) > 1) | (np.diff(front['run'][moving]) != 0)) + 1
+    runs = [(g[0], g[-1] + 1) for g in np.split(moving, breaks)] if len(moving) else []
+
+    clock, stops, short, collisions, clearance = 0.0, 0, 0, 0, np.inf
+    for k, (start, end) in enumerate(runs):
+        t, d, s = front['t'][start:end], front['d'][start:end], front['speed'][start:end]
+
+        # Walk the recorded run faster or slower, one control loop period at a time
+        tr, stop_at = t[0], None
+        while tr <= t[-1]:
+            reading = np.interp(tr, t, d)
+            if reading <= dist_min:
+                stop_at = reading
+                break
+            clock += period
+            tr += period * speed / np.interp(tr, t, s)
+
+        # The recorded car stopped at its own threshold; a candidate that has not stopped yet keeps closing in
+        if stop_at is None and k < len(runs) - 1:
+            ticks = max(0, int(np.ceil((d[-1] - dist_min) / (v * period))))
+            clock += ticks * period
+            stop_at = d[-1] - ticks * v * period
+        if stop_at is None:
+            continue
+
+        # Stop, check the clearance left after the command round trip, then evade
+        stops += 1
+        left = stop_at - v * latency
+        clearance = min(clearance, left)
+        collisions += left < COLLISION
+        clock += 3 * ROTATE_TIME + 6 * latency  # Stop, sensor sweep and re-centering
+
+        i = np.searchsorted(sides['t'], t[-1])
+        where = choose_evasion(sides['left'][i], sides['right'][i], dist_min) if i < len(sides) else 'back'
+        if where == 'back':
+            clock += BACK_S + 2 * latency  # Reverse, then the front check
+        elif where != 'forward':
+            seconds, cut = body_turn(turn_angle(TURN_S, speed, d180), speed, 1.5 * TURN_S)
+            clock += seconds + 3 * latency  # Turn, side check and move
+            short += cut
+        else:
+            clock += latency  # Move on
+
+        # Re-aim at the ball when find_ball() sees it before the car drives on, else turn around in its second cycle
+        j = np.searchsorted(balls['t'], t[-1])
+        resume = front['t'][runs[k + 1][0]] if k < len(runs) - 1 else np.inf
+        if j < len(balls) and balls['t'][j] < resume:
+            angle = balls['ang_deg'][j]
+            seconds, cut = body_turn(angle, speed, 1.5 * turn_time(angle, speed, dturn))
+        else:
+            seconds, cut = body_turn(180, speed, 1.5 * turn_time(180, speed, d180))
+        clock += seconds
+        short += cut
+
+    return {
+        'speed': speed, 'dist_min': dist_min, 'd180': d180, 'dturn': dturn,
+        'time': round(clock, 2), 'stops': stops, 'short_turns': int(short), 'collisions': int(collisions),
+        'min_clearance': round(float(clearance), 1) if np.isfinite(clearance) else None,
+    }
+
+def evaluate(data, grid, workers=None):
+    """
+    Runs every parameter set of the grid over a process pool.
+
+    Returns:
+        results (list): One result per parameter set, sorted by collisions, short turns and completion time.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=init, initargs=(data,)) as pool:
+        results = list(pool.map(simulate, grid, chunksize=max(1, len(grid) // 64)))
+    return sorted(results, key=lambda r: (r['collisions'], r['short_turns'], r['time']))
+
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('Description: ')[1].split('\n')[0])
+    parser.add_argument('sessions', nargs='+', help='recorded session folders')
+    parser.add_argument('--speed', type=int, nargs='+', default=[100], help='car speeds')
+    parser.add_argument('--dist-min', type=float, nargs='+', default=[30], help='minimum distances to an obstacle (cm)')
+    parser.add_argument('--d180', type=float, nargs='+', default=[90], help='rotation distances for a 180-degree turn')
+    parser.add_argument('--dturn', type=float, nargs='+', default=[60], help='rotation distances for smaller turns')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--top', type=int, default=20, help='number of results to print')
+    args = parser.parse_args()
+
+    data = load(args.sessions)
+    grid = list(itertools.product(args.speed, args.dist_min, args.d180, args.dturn))
+    rate = f"{data['deg_per_speed']:.3f} deg/s" if data['deg_per_speed'] is not None else 'no gyro samples, open-loop turn times'
+    print(f"{len(data['front'])} front readings, {len(data['sides'])} side sweeps, "
+          f"round trip {data['latency'] * 1000:.0f} ms, {data['cm_per_speed']:.3f} cm/s and {rate} per speed unit")
+    print(f"Evaluating {len(grid)} parameter sets...")
+
+    print(f"{'speed':>6} {'dist_min':>9} {'d180':>6} {'dturn':>6} {'time (s)':>9} {'stops':>6} {'short':>6} {'collisions':>11} {'clearance':>10}")
+    for r in evaluate(data, grid, args.workers)[:args.top]:
+        print(f"{r['speed']:>6} {r['dist_min']:>9} {r['d180']:>6} {r['dturn']:>6} {r['time']:>9} "
+              f"{r['stops']:>6} {r['short_turns']:>6} {r['collisions']:>11} {str(r['min_clearance']):>10}")
+
+
+
+
+if __name__ == '__main__':
+    main()
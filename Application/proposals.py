@@ -0,0 +1,204 @@
+"""
+Ball Candidate Proposals,
+Date: 2026-10-19,
+Description: Shrinks the part of the frame that goes through color classification. While the car is stopped and the camera does not move, a MOG2 background subtractor on a downscaled frame, fed by the background capture thread, marks the regions that changed. Together with the box of the last ball seen, these regions are the only parts of the frame that get blurred, converted to HSV, thresholded and cleaned with morphology. When the car or the head moves the background model is dropped and the whole frame is used again. Contours are also scored by circularity, so red clutter with the wrong shape is rejected before its distance and angle are computed.
+"""
+
+
+
+
+# Load modules
+import threading  # Lock shared by the capture thread and the control loop
+import imutils  # Additional OpenCV utilities
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+
+
+
+
+def color_mask(img, ranges):
+    """
+    Runs the color filtering steps of capture() on an image or a crop of it.
+
+    Args:
+        ranges (list): Lower and upper HSV bounds, several for a color split by the hue wraparound.
+
+    Returns:
+        mask (numpy.ndarray): Binary mask of the pixels inside the HSV ranges, cleaned with morphology.
+    """
+    mask = cv.medianBlur(img, 5)                  # Apply median blur to reduce noise
+    img_hsv = cv.cvtColor(mask, cv.COLOR_BGR2HSV) # Convert the image to HSV color space
+    mask = cv.inRange(img_hsv, *ranges[0])        # Apply color filter
+    for lower, upper in ranges[1:]:
+        mask |= cv.inRange(img_hsv, lower, upper)  # Other part of the hue range
+    mask = cv.erode(mask, None, iterations=2)     # Erode to reduce noise
+    mask = cv.dilate(mask, None, iterations=2)    # Dilate to restore object size
+    return mask
+
+def color_contours(img, color_range, rois=None):
+    """
+    Finds the contours of a color in the whole frame or only inside the given regions.
+
+    Args:
+        img (numpy.ndarray): Decoded BGR frame.
+        color_range (tuple): Lower and upper HSV bounds, or a list of them for red, which wraps around hue 0/180.
+        rois (list): Regions as (x, y, w, h) tuples, or None for the whole frame.
+
+    Returns:
+        cont (list): Contours in full-frame coordinates.
+    """
+    ranges = color_range if isinstance(color_range, list) else [color_range]
+    if not rois:
+        mask = color_mask(img, ranges)
+        return list(imutils.grab_contours(cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)))
+
+    cont = []
+    for x, y, w, h in rois:
+        crop = img[y:y + h, x:x + w]
+        if crop.shape[0] < 8 or crop.shape[1] < 8:
+            continue  # Too small for the blur and morphology kernels
+        mask = color_mask(crop, ranges)
+        found = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        cont.extend(imutils.grab_contours(found))
+    return cont
+
+def circularity(contour):
+    """
+    Returns 4*pi*area/perimeter^2, 1 for a perfect circle and close to 0 for thin shapes.
+    """
+    perimeter = cv.arcLength(contour, True)
+    if perimeter == 0:
+        return 0.0
+    return 4 * np.pi * cv.contourArea(contour) / perimeter ** 2
+
+
+
+
+class MotionProposer:
+    """
+    Proposes regions of the frame that may hold the ball while the camera is still.
+
+    Args:
+        scale (float): Downscale factor of the frame given to the background subtractor.
+        pad (int): Margin added around each region, in full-frame pixels.
+        min_area (int): Smallest foreground blob kept, in downscaled pixels.
+        warmup (int): Frames the background model needs before it is trusted.
+    """
+
+    def __init__(self, scale=0.2, pad=24, min_area=4, warmup=5):
+        self.scale = scale
+        self.pad = pad
+        self.min_area = min_area
+        self.warmup = warmup
+        self.stationary = False   # Set by the command layer when the car and head are still
+        self.subtractor = None
+        self.frames = 0           # Frames seen by the current background model
+        self.last_box = None      # Bounding box of the last ball detected
+        self.proposed = 0         # Frames classified only inside proposals
+        self.full = 0             # Frames classified over the whole image
+        self.fallbacks = 0        # Proposals without a ball, re-run over the whole image
+        self.pixels = 0.0         # Sum of the fraction of the frame covered by proposals
+        self.head = None          # Last head angle, turning the head moves the camera
+        self.lock = threading.Lock()
+
+    def set_stationary(self, stationary):
+        """
+        Tells the proposer whether the camera is still. Any movement invalidates the background.
+        """
+        with self.lock:
+            if not stationary:
+                self.subtractor = None
+                self.frames = 0
+            self.stationary = stationary
+
+    def reset(self):
+        """
+        Drops the background model after the camera moved, a new one is learned from the next frames.
+        """
+        with self.lock:
+            self.subtractor = None
+            self.frames = 0
+
+    def rotate(self, angle):
+        """
+        Tells the proposer the head was sent to an angle. Only an actual change moves the camera.
+        The wheels keep their state, so a stopped car goes on proposing once the new model warmed up.
+        """
+        if angle != self.head:
+            self.head = angle
+            self.reset()
+
+    def foreground(self, img):
+        """
+        Updates the background model with a frame and returns its foreground mask, or None while warming up.
+        """
+        small = cv.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+        if self.subtractor is None:
+            self.subtractor = cv.createBackgroundSubtractorMOG2(history=50, varThreshold=16, detectShadows=False)
+        fg = self.subtractor.apply(small)
+        self.frames += 1
+        return fg if self.frames > self.warmup else None
+
+    def observe(self, img):
+        """
+        Feeds a frame from the background capture thread to the model while the camera is still.
+        """
+        with self.lock:
+            if self.stationary and img is not None:
+                self.foreground(img)
+
+    def remember(self, box):
+        """
+        Stores the bounding box of the detected ball, or None when it was lost.
+        """
+        self.last_box = box
+
+    def region(self, x, y, w, h, width, height):
+        x0, y0 = max(0, x - self.pad), max(0, y - self.pad)
+        x1, y1 = min(width, x + w + self.pad), min(height, y + h + self.pad)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def propose(self, img):
+        """
+        Returns the regions to classify in this frame.
+
+        Returns:
+            rois (list): Regions as (x, y, w, h) tuples, or None to classify the whole frame.
+        """
+        height, width = img.shape[:2]
+
+        # Background model on a small frame, it only has to find where things changed
+        with self.lock:
+            fg = self.foreground(img) if self.stationary else None
+        if fg is None:
+            self.full += 1
+            return None
+
+        fg = cv.morphologyEx(fg, cv.MORPH_OPEN, None)
+        n, _, blobs, _ = cv.connectedComponentsWithStats(fg)
+        rois = []
+        for x, y, w, h, area in blobs[1:n]:
+            if area >= self.min_area:
+                rois.append(self.region(int(x / self.scale), int(y / self.scale),
+                                        int(w / self.scale), int(h / self.scale), width, height))
+        if self.last_box is not None:
+            rois.append(self.region(*self.last_box, width, height))  # A still ball is not foreground
+
+        if not rois:
+            self.full += 1
+            return None
+        self.proposed += 1
+        self.pixels += sum(w * h for _, _, w, h in rois) / (width * height)
+        return rois
+
+    def stats(self):
+        """
+        Returns the proposer counters as a dictionary.
+        """
+        return {
+            'stationary': self.stationary,
+            'proposed': self.proposed,
+            'full': self.full,
+            'fallbacks': self.fallbacks,
+            'mean_coverage': round(self.pixels / self.proposed, 3) if self.proposed else None,
+        }
@@ -0,0 +1,488 @@
+"""
+Robot Application,
+Created by: Michael Bozall,
+Date: 2021-08-25,
+Modified by: Rodrigo Barba,
+Date: 2026-10-19,
+Description: Single application for ball tracking and obstacle avoidance. The behaviors run on the shared perception and transport core (robot_core.py) and are arbitrated by priority: safety stop, then obstacle avoidance, then ball tracking, then ball search. The ROBOT_MODE environment variable selects the initial mode ('combined', 'ball', 'obstacle' or 'idle'), and the mode can be switched at runtime from the web interface.
+"""
+
+
+
+
+# Load modules
+import os  # Environment variables
+import time  # Time-related functions
+import numpy as np  # Numerical operations with arrays
+from flask import render_template, jsonify  # Template rendering
+from robot_core import app, socketio, car, cmd, capture, connect, start, settle, turn, emit_console, link, tracer, recorder, speed
+from robot_core import odometry, searching, spotted, wait
+from behaviors import choose_evasion, search_turn, turn_time, turn_angle  # Decision rules shared with the policy evaluation
+from behavior_engine import Behavior, BehaviorEngine  # Priority arbitration
+from search_planner import SearchPlanner  # Scan order from the last sightings of the ball
+
+
+
+
+# Define movement and measurement parameters
+ang_tol = 10  # Tolerance for rotation angle (degrees)
+ang = [90, ang_tol, 180 - ang_tol]  # Head rotation angles for the ball search (center, left, right)
+dist = {}  # Measured distances to obstacles by head angle
+dist_min = 30  # Minimum safe distance to an obstacle (cm)
+d180 = 90  # Equivalent rotation distance for a 180-degree turn
+dturn = 60  # Equivalent rotation distance for smaller turns
+evade_ang = [90, 45, 135]  # Head rotation angles for the obstacle evasion
+side_dist = [0, 0, 0]  # Measured distances at the evasion angles
+turn_s = 0.5  # Open-loop time of the original evasion turn (s), its angle is now the target and 1.5 times the time the limit
+lost_max = 5  # Frames without the ball before searching for it again
+lost = lost_max  # Search unless the ball is in view on the first frame
+planner = SearchPlanner(step=40, head=(ang[1], ang[2]))  # Sightings of the ball
+
+
+
+
+#%% Function to find the ball
+def find_ball():
+    """
+    Locates the ball by rotating the robot's head and measuring distances.
+    
+    Steps:
+    1. Plan the head angles from the last sightings of the ball, most probable first.
+    2. Rotate the head to each planned angle, measure the distance and detect the ball in the camera feed.
+       The rotation is skipped when the camera stream already shows the ball, and the head and settle
+       waits end as soon as the stream spots it.
+    3. If the ball is detected and within an acceptable distance, adjust the robot's position to face it.
+    4. Otherwise turn the robot around and scan center, right and left.
+
+    Returns:
+        found (int): 1 if the robot is facing the ball, 0 otherwise.
+    """
+    spotted.clear()
+    searching.set()  # Let the camera thread watch for the ball
+    settle(0.5)  # Pause briefly before starting the search
+    found = 0  # Flag to indicate if the ball was found
+    head = 90  # Every behavior leaves the head centered
+    looks = cancelled = 0
+
+    # Perform two search cycles
+    for n in range(2):
+        if n == 0:
+            steps = planner.plan(odometry.yaw)  # Most probable direction first
+        else:
+            # In the second cycle, turn the robot based on distance measurements at the outermost angles
+            for a in (ang[1], ang[2]):
+                if a not in dist:  # The planned scan may not have reached this side
+                    head = a
+                    cmd(car, do='rotate', at=head)
+                    wait(0.5)
+                    dist[head] = cmd(car, do='measure', what='distance')
+            with link.critical():  # No frame transfer may delay the stop
+                turn(search_turn(dist_left=dist[ang[2]], dist_right=dist[ang[1]]), 180, 1.5 * turn_time(180, speed, d180))  # Turn away from the closer side
+            steps = planner.default()
+        dist.clear()
+
+        for step in steps:
+            if step[0] == 'turn':  # The ball was last seen out of reach of the head
+                with link.critical():
+                    turn(step[1], step[2], 1.5 * turn_time(step[2], speed, dturn))
+                continue
+
+            # When the camera stream showed the ball since the last capture, confirm it at the current angle instead of rotating
+            looks += 1
+            ball = 0
+            if spotted.is_set():
+                ball, bd, ba_rad, ba_deg = capture()
+                cancelled += ball
+            spotted.clear()  # Only frames taken during this look count from here on
+            if not ball:
+                head = step[1]
+                cmd(car, do='rotate', at=head)  # Rotate head to the planned angle
+                cancelled += wait(0.5)  # Let the head settle, the wait ends early when the stream spots the ball
+                spotted.clear()
+            dist[head] = cmd(car, do='measure', what='distance')  # Measure distance
+            if not ball:
+                ball, bd, ba_rad, ba_deg = capture()  # Capture image and detect ball
+            tracer.mark('decision')
+            
+            # If a ball is detected, refine measurements with full head and settle waits
+            if ball:
+                searching.clear()
+                if head != 90 and abs(ba_deg) > ang_tol:
+                    # Adjust head angle to align more precisely with the ball
+                    um_ang = min(max(head - ba_deg, ang[1]), ang[2])
+                    cmd(car, do='rotate', at=um_ang)  # Rotate to the updated angle
+                    wait(0.5)  # Full wait, the stream watch is paused while refining
+                    d = cmd(car, do='measure', what='distance')  # Measure distance
+                    ball, bd, ba_rad, ba_deg = capture()  # Re-capture and re-detect
+                    tracer.mark('decision')
+                    head = um_ang
+                else:
+                    um_ang = head  # Use the current angle
+                    d = dist[head]  # Use the measured distance
+                
+                # If no ball is detected after adjustment, skip
+                if not ball:
+                    spotted.clear()  # The stream saw something else, keep scanning
+                    searching.set()
+                    continue
+                
+                # If the detected ball is beyond the minimum safe distance
+                if d > dist_min:
+                    found = 1  # Mark ball as found
+                    socketio.emit(
+                        'console',
+                        {
+                            'type': 'action',
+                            'color': '#a1ff0a',
+                            'data': f"Ball found at {round(bd)} cm and {ba_deg} degrees",
+                        }
+                    )
+
+                    # Rotate head back to the center
+                    cmd(car, do='rotate', at=90)
+                    head = 90
+                    
+                    # Calculate the steering angle to face the ball
+                    steer_ang = 90 - um_ang + ba_deg
+                    planner.record(steer_ang, bd, odometry.yaw, False)
+                    
+                    # Log the steering angle and adjust position
+                    socketio.emit(
+                        'console',
+                        {
+                            'type': 'action',
+                            'color': '#a1ff0a',
+                            'data': f"Steering angle: {steer_ang} degrees",
+                        }
+                    )
+                    if steer_ang > ang_tol:  # If the angle is to the right
+                        turn('right', steer_ang, 1.5 * turn_time(steer_ang, speed, dturn))  # Turn right until facing the ball
+                    elif steer_ang < -ang_tol:  # If the angle is to the left
+                        turn('left', steer_ang, 1.5 * turn_time(steer_ang, speed, dturn))  # Turn left until facing the ball
+                    else:
+                        cmd(car, do='stop')  # Stop the robot
+                    settle(0.5)  # Pause briefly
+                    _, bd, ba_rad, ba_deg = capture()  # Re-capture the image
+                
+                break  # Exit the current angle loop once the ball is found
+        
+        # Exit the main search loop if the ball is found
+        if found:
+            break
+
+    searching.clear()
+    planner.done(found, looks, cancelled)
+
+    # If the ball is not found, reset head position
+    if head != 90:
+        cmd(car, do='rotate', at=90)  # Rotate head back to the center
+    return found
+
+
+
+
+#%% Function to track the ball
+def track_ball(detection):
+    """
+    Tracks the ball by calculating the turning radius and adjusting wheel speeds.
+
+    Args:
+        detection (tuple): Result of capture() with the ball in view.
+    """
+    ball, bd, ba_rad, ba_deg = detection
+    # Calculate the turning radius needed to approach the ball
+    r = bd / (2 * np.sin(ba_rad))  # Required turning radius
+    if r > 0 and r <= 707:  # If the radius indicates a right turn
+        s0 = 1.111          # Speed ratio for turning right
+        ra = -17.7          # Radius offset for right turns
+        rb = 98.4           # Radius factor for right turns
+    else:  # For left turns or moving straight
+        s0 = 0.9557         # Speed ratio to move straight
+        ra = 5.86           # Radius offset for left turns
+        rb = -55.9          # Radius factor for left turns
+
+    # Calculate speed ratio for the left and right wheels
+    speed_ratio = s0 * (r - ra) / (r + rb)  # Adjust speed based on radius
+    speed_ratio = max(0, speed_ratio)  # Ensure speed ratio is non-negative
+
+    # Determine wheel speeds based on the turning direction
+    if r > 0 and r <= 707:  # Right turn
+        lspeed = speed      # Left wheel speed (full speed)
+        rspeed = round(speed * speed_ratio)  # Right wheel speed
+    else:  # Left turn or moving straight
+        lspeed = round(speed * speed_ratio)  # Left wheel speed
+        rspeed = speed      # Right wheel speed
+
+    # Send the speed command to the robot
+    cmd(car, do='set', at=[rspeed, lspeed])
+
+
+
+
+#%% Evasion of obstacles
+def evade_obstacle():
+    """
+    Handles obstacle evasion with smarter behavior to avoid getting stuck in corners or retrying unnecessary actions.
+    """
+    socketio.emit(
+        'console',
+        {
+            'type': 'action',
+            'color': '#147df5',
+            'data': "Obstacle detected. Evading...",
+        }
+    )
+    with link.critical():  # No frame transfer may delay the stop
+        cmd(car, do='stop')  # Stop the car
+    link.hold(False)  # The camera keeps streaming while the head scans
+    
+    # Rotate the sensor to left and right to measure distances
+    for i in [1, 2]:
+        cmd(car, do='rotate', at=evade_ang[i])
+        side_dist[i] = cmd(car, do='measure', what='distance')
+    cmd(car, do='rotate', at=90)  # Re-center the sensor
+
+    # Evaluate distances and decide direction
+    where = choose_evasion(side_dist[1], side_dist[2], dist_min)
+    if where == 'forward':  # Both sides clear
+        socketio.emit(
+            'console',
+            {
+                'type': 'action',
+                'color': '#580aff',
+                'data': "Both sides clear. Moving forward.",
+            }
+        )
+        cmd(car, do='move', where='forward', at=speed)
+    elif where == 'left':  # More space to the left
+        socketio.emit(
+            'console',
+            {
+                'type': 'action',
+                'color': '#be0aff',
+                'data': "Turning left to avoid obstacle.",
+            }
+        )
+        with link.critical():  # Closed-loop turn, its motion samples must not wait behind a frame
+            turn('left', turn_angle(turn_s, speed, d180), 1.5 * turn_s)  # Same angle as the original open-loop turn
+
+        # Check if left turn was successful and has enough space to continue
+        left_check = cmd(car, do='measure', what='distance')
+        if left_check > dist_min:
+            socketio.emit(
+                'console',
+                {
+                    'type': 'action',
+                    'color': '#be0aff',
+                    'data': "Space cleared after left turn, continuing.",
+                }
+            )
+            cmd(car, do='move', where='forward', at=speed)
+        else:
+            socketio.emit(
+                'console',
+                {
+                    'type': 'action',
+                    'color': '#be0aff',
+                    'data': "No space after left turn. Moving backward.",
+                }
+            )
+
+            cmd(car, do='move', where='back', at=speed)
+            time.sleep(0.5)
+    elif where == 'right':  # More space to the right
+        socketio.emit(
+            'console',
+            {
+                'type': 'action',
+                'color': '#0aefff',
+                'data': "Turning right to avoid obstacle.",
+            }
+        )
+        with link.critical():  # Closed-loop turn, its motion samples must not wait behind a frame
+            turn('right', turn_angle(turn_s, speed, d180), 1.5 * turn_s)  # Same angle as the original open-loop turn
+
+        # Check if right turn was successful and has enough space to continue
+        right_check = cmd(car, do='measure', what='distance')
+        if right_check > dist_min:
+            socketio.emit(
+                'console',
+                {
+                    'type': 'action',
+                    'color': '#0aefff',
+                    'data': "Space cleared after right turn, continuing.",
+                }
+            )
+            cmd(car, do='move', where='forward', at=speed)
+        else:
+            socketio.emit(
+                'console',
+                {
+                    'type': 'action',
+                    'color': '#0aefff',
+                    'data': "No space after right turn. Moving backward.",
+                }
+            )
+            cmd(car, do='move', where='back', at=speed)
+            time.sleep(0.5)
+    else:  # No space on either side, move backward
+        socketio.emit(
+            'console',
+            {
+                'type': 'action',
+                'color': '#0aff99',
+                'data': "No space on either side. Moving backward.",
+            }
+        )
+        cmd(car, do='move', where='back', at=speed)
+        time.sleep(0.5)
+
+    # Final check after evasive action, if stuck for too long, reset or reverse more
+    attempt = 0
+    while True:
+        front_distance = cmd(car, do='measure', what='distance')
+        if front_distance > dist_min or attempt > 3:  # Path cleared or too many failed attempts
+            break
+        socketio.emit(
+            'console',
+            {
+                'type': 'action',
+                'color': '#ffd300',
+                'data': "Obstacle still in front. Moving backward.",
+            }
+        )
+        cmd(car, do='move', where='back', at=speed)
+        time.sleep(0.5)
+        attempt += 1
+
+    cmd(car, do='stop')  # Stop after avoiding obstacle
+
+
+
+
+#%% Behaviors, from the highest to the lowest priority
+def lifted(state):
+    return cmd(car, do='check')  # The car was lifted off the ground
+
+def safety_stop(state):
+    cmd(car, do='stop')  # Protect the motors
+    emit_console('action', '#ff0000', "Car was lifted off the ground. Stopping...")
+    engine.set_mode('idle')  # Resumed from the web interface
+
+def obstacle(state):
+    state['distance'] = cmd(car, do='measure', what='distance')
+    link.hold(state['distance'] <= 2 * dist_min)  # Finish the frame transfers before a stop may be needed
+    return state['distance'] <= dist_min
+
+def stop_and_find(state):
+    global lost
+    with link.critical():  # No frame transfer may delay the stop
+        cmd(car, do='stop')
+    link.hold(False)  # The search needs the camera stream
+    lost = 0 if find_ball() else lost_max  # Re-locate the ball after stopping
+
+def evade(state):
+    evade_obstacle()  # Pauses background frames for the stop and the turns only
+
+def ball_seen(state):
+    global lost
+    state['detection'] = capture()  # Capture the current image and check for the ball
+    tracer.mark('decision')
+    lost = 0 if state['detection'][0] else lost + 1
+    if not lost:
+        return True
+    tracer.end()  # No speed command for this frame
+    return False
+
+def track(state):
+    _, bd, _, ba_deg = state['detection']
+    planner.record(ba_deg, bd, odometry.yaw, True)  # The head is centered while tracking
+    track_ball(state['detection'])
+    tracer.end()  # The trace of this frame ends with its speed command
+
+def ball_lost(state):
+    return lost >= lost_max
+
+def search(state):
+    global lost
+    cmd(car, do='stop')
+    lost = 0 if find_ball() else lost_max  # Keep searching until the ball is in view
+
+def always(state):
+    return True
+
+def forward():
+    cmd(car, do='move', where='forward', at=speed)  # Resume forward movement
+
+safety = Behavior('safety', lifted, safety_stop)
+modes = {
+    'combined': [safety, Behavior('avoid', obstacle, evade), Behavior('track', ball_seen, track), Behavior('search', ball_lost, search)],
+    'ball': [safety, Behavior('avoid', obstacle, stop_and_find), Behavior('track', ball_seen, track), Behavior('search', ball_lost, search)],
+    'obstacle': [safety, Behavior('avoid', obstacle, evade), Behavior('cruise', always, lambda state: None, enter=forward)],
+    'idle': [],
+}
+
+def change_mode(old, new):
+    """
+    Stops the car and centers the head between two modes.
+    """
+    global lost
+    link.hold(False)  # The new mode may not measure the front distance
+    cmd(car, do='stop')
+    cmd(car, do='rotate', at=90)
+    lost = lost_max  # A new ball mode starts with a search
+    emit_console('action', '#147df5', f"Mode changed from {old} to {new}")
+
+engine = BehaviorEngine(modes, os.environ.get('ROBOT_MODE', 'combined'), on_mode=change_mode)
+
+
+
+
+@app.route('/')
+def console_log():
+    return render_template('app.html', modes=list(modes), mode=engine.mode)
+
+@app.route('/behaviors')
+def behavior_stats():
+    """
+    A Flask route with the mode, the active behavior and how often each behavior acted.
+    """
+    return jsonify(engine.stats())
+
+@app.route('/search')
+def search_stats():
+    """
+    A Flask route with the predicted bearing of the ball and the counters of the search planner.
+    """
+    return jsonify(planner.stats(odometry.yaw))
+
+@socketio.on('mode')
+def select_mode(mode):
+    """
+    Socket.IO event from the web interface to switch the mode.
+    """
+    try:
+        engine.set_mode(mode)
+    except ValueError as e:
+        emit_console('action', '#ff0000', str(e))
+
+
+
+
+#%% Main logic
+def main():
+    start()
+    connect()
+    cmd(car, do='rotate', at=90)  # Start with the head centered
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cmd(car, do='stop')  # Ensure car stops
+        car.close()  # Close the connection to the robot's WiFi
+        if recorder is not None and not recorder.close():  # Flush the recorded session
+            print('Session recorder did not flush, the last records are lost')
+
+if __name__ == '__main__':
+    main()
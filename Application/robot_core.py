@@ -0,0 +1,717 @@
+"""
+Robot Core,
+Created by: Michael Bozall,
+Date: 2021-08-25,
+Modified by: Rodrigo Barba,
+Date: 2026-10-19,
+Description: Perception and transport shared by every behavior of the robot. One process owns the camera thread, the ball detector, the web interface with the video stream, and the command socket to the car. The behaviors in robot_app.py only call capture(), cmd() and the turn helpers below, so switching between ball tracking and obstacle avoidance no longer needs a second container on the same port.
+"""
+
+
+
+
+# Load modules
+import sys  # System-specific parameters and functions
+import time   # Time-related functions
+import socket  # Networking support
+import threading  # Thread-based parallelism
+import cv2 as cv  # OpenCV for computer vision tasks
+import numpy as np  # Numerical operations with arrays
+from flask_socketio import SocketIO, emit  # Socket communication for web interface
+from flask import Flask, jsonify, request  # Web server
+from frame_quality import FrameGate  # Blur and duplicate pre-filter
+from hsv_calibration import ProfileStore, sample_region, compute_bounds  # HSV auto-calibration
+from streaming import FrameBroadcaster, run_server  # Shared MJPEG stream and server modes
+from overlay import Overlay  # Annotations drawn in the streaming layer
+from tracing import Tracer  # Per-frame latency tracing
+from session_store import SessionWriter  # Recording of runs for offline analysis
+from link_manager import LinkManager  # Camera and command traffic on the WiFi link
+from proposals import MotionProposer, color_contours, circularity  # Candidate regions and shape filter
+from odometry import Odometry  # IMU heading and closed-loop turns
+from memory_budget import FramePool, memory_stats  # Bounded frame retention on low-RAM boards
+from car_protocol import CommandChannel  # Framing of the command socket
+from detectors import DnnDetector  # Learned ball detector on the CPU
+
+
+
+import os
+
+# Define color ranges for filtering
+color_ranges = {
+    "green": (np.array([50, 70, 60], dtype="uint8"), np.array([90, 255, 255], dtype="uint8")),
+    "blue": (np.array([100, 150, 0], dtype="uint8"), np.array([140, 255, 255], dtype="uint8")),
+    "red": (np.array([0, 150, 100], dtype="uint8"), np.array([10, 255, 255], dtype="uint8")),
+    "red2": (np.array([170, 150, 100], dtype="uint8"), np.array([180, 255, 255], dtype="uint8"))
+}
+
+# Load the calibrated HSV profile for this venue on top of the defaults above
+profiles = ProfileStore(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'),  # One JSON file per profile
+    os.environ.get('HSV_PROFILE', 'default'),  # Profile name, e.g. the venue
+)
+profiles.poll(color_ranges)
+if profiles.error:
+    print(profiles.error)  # The defaults are used until the file is fixed
+
+# Capture image from camera
+# cv.namedWindow('Camera')         # Create a named window for displaying the camera feed
+# cv.moveWindow('Camera', 0, 0)    # Position the window at the top-left corner of the screen
+
+# Flask setup
+app = Flask(__name__)
+
+# Initialize SocketIO
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+
+# Shared variable to hold the captured image
+current_frame = None
+
+# Memory budget for 1 GB boards, enabled with MEMORY_BUDGET=1: retained frames at half resolution
+# (grayscale with MEMORY_GRAY=1) in a fixed pool, fewer viewers and shorter queues
+budget = os.environ.get('MEMORY_BUDGET') == '1'
+pool = FramePool(slots=3, scale=0.5, gray=os.environ.get('MEMORY_GRAY') == '1') if budget else None
+
+# Detection annotations, drawn only on frames sent to viewers
+overlay = Overlay(yh=491, scale=pool.scale if budget else 1.0)
+
+# Single JPEG encoder shared by all /video_feed viewers
+broadcaster = FrameBroadcaster(
+    max_viewers=int(os.environ.get('MAX_VIEWERS', 2 if budget else 4)),
+    quality=70 if budget else 80,
+    compose=overlay.compose,
+)
+
+cmd_no = 0  # Initialize the command number counter
+
+# Pre-filter for blurred and duplicated frames, and the last result to reuse for duplicates
+frame_gate = FrameGate(blur_ratio=0.5, changed_max=0.0002)
+last_detection = (0, None, 0, 0)
+
+# Motion-based candidate regions while the car is stopped, enabled with PROPOSALS=1
+proposer = MotionProposer() if os.environ.get('PROPOSALS') == '1' else None
+min_circularity = 0.5  # Contours less round than this are not taken as the ball
+
+# While find_ball() scans, the camera thread also looks for the ball so the scan can stop early
+searching = threading.Event()
+spotted = threading.Event()
+
+# Shared WiFi link, commands take priority over background frames
+link = LinkManager(interval=0.1, max_interval=1.0, rtt_target=0.05)
+
+# Learned ball detector when DETECTOR_MODEL points to an ONNX model, HSV for the frames it cannot answer in time
+detector = None
+if os.environ.get('DETECTOR_MODEL'):
+    detector = DnnDetector(
+        os.environ['DETECTOR_MODEL'],
+        backend=os.environ.get('DETECTOR_BACKEND', 'opencv'),  # or 'onnxruntime'
+        threads=int(os.environ.get('DETECTOR_THREADS', 2)),
+        batch=int(os.environ.get('DETECTOR_BATCH', 1)),  # More only for models with a dynamic batch axis
+        budget=link.interval,  # One frame interval
+    )
+
+# Latency traces from camera fetch to motor command
+tracer = Tracer(size=100 if budget else 500)
+
+# Record frames, detections and commands when RECORD_SESSION points to a folder
+recorder = None
+if os.environ.get('RECORD_SESSION'):
+    recorder = SessionWriter(
+        os.path.join(os.environ['RECORD_SESSION'], time.strftime('%Y%m%d-%H%M%S')),
+        queue_size=64 if budget else 512,  # Queued JPEGs are the largest records
+    )
+
+# Function to switch between colors
+def switch_color(color="blue") -> tuple:
+    """
+    Switches to the desired color HSV range for detection.
+    Accepts "green", "blue", or "red" as input. Red returns both of its ranges, its hue wraps around 0/180.
+    """
+    if color == "green":
+        return color_ranges["green"]
+    elif color == "blue":
+        return color_ranges["blue"]
+    elif color == "red":
+        return [color_ranges["red"], color_ranges["red2"]]
+    elif color == "red2":  # for the second red range due to HSV wraparound
+        return color_ranges["red2"]
+    else:
+        print("Invalid color. Defaulting to green.")
+        return color_ranges["green"]
+
+def show():
+    """
+    Captures an image from the camera and stores it in the global variable.
+    This function runs in a separate thread to ensure the image is updated continuously.
+    """
+    global current_frame
+    spot = None  # Background frame submitted to the learned detector
+    while True:
+        # Capture the image from the car's camera
+        img = capture_image()  # Assuming capture_image() is your current capture() method
+        stamp = time.monotonic()  # Fetch time, the overlay only draws detections from frames close to it
+        if proposer is not None:
+            proposer.observe(img)  # Learn the background while the car is stopped
+        if searching.is_set() and not spotted.is_set():
+            if detector is not None and detector.keeping_up():
+                if spot is not None and spot.boxes and select_box(spot.boxes, 491) is not None:
+                    spotted.set()  # Result of the previous frame, batched with the frames of capture()
+                spot = detector.submit(img)
+            elif select_ball(color_contours(img, switch_color('red')), 491) is not None:
+                spotted.set()  # The head already looks at the ball
+        if pool is not None:
+            img = pool.retain(img)  # Reduced copy in a pool buffer, the decoded frame is freed
+        current_frame = img  # Store the image in the shared variable
+        broadcaster.publish(img, stamp)  # Encode once for all connected viewers
+        time.sleep(link.camera_interval())  # Slower when command replies are late
+
+def capture_image():
+    """
+    Capture the image using the camera and return it.
+    """
+    global cmd_no
+    img = link.fetch('http://192.168.4.1/capture')  # Waits while a maneuver is in progress
+    img = np.asarray(bytearray(img), dtype='uint8')
+    img = cv.imdecode(img, cv.IMREAD_UNCHANGED)
+    return img
+
+@app.route('/video_feed')
+def video_feed():
+    """
+    A Flask route to stream the current image to the browser.
+    """
+    return broadcaster.response()  # Frames are encoded once by the capture thread
+
+@app.route('/stream_stats')
+def stream_stats():
+    """
+    A Flask route with the viewer and encoding counters of the video stream.
+    """
+    return jsonify(broadcaster.stats())
+
+@app.route('/frame_stats')
+def frame_stats():
+    """
+    A Flask route with the counters of frames skipped by the quality gate.
+    """
+    return jsonify(frame_gate.stats())
+
+@app.route('/traces')
+def traces():
+    """
+    A Flask route with the latest per-frame latency traces.
+    """
+    return jsonify(tracer.dump())
+
+@app.route('/traces/summary')
+def traces_summary():
+    """
+    A Flask route with the p50/p95/p99 latency of each traced stage.
+    """
+    return jsonify(tracer.summary())
+
+@app.route('/detector')
+def detector_stats():
+    """
+    A Flask route with the batches, latency and HSV fallbacks of the learned detector.
+    """
+    return jsonify(detector.stats() if detector is not None else {'enabled': False})
+
+@app.route('/proposals')
+def proposal_stats():
+    """
+    A Flask route with the counters of the candidate proposal stage.
+    """
+    return jsonify(proposer.stats() if proposer is not None else {'enabled': False})
+
+@app.route('/link')
+def link_stats():
+    """
+    A Flask route with the link-quality metrics of the camera and command channels.
+    """
+    return jsonify(link.stats())
+
+@app.route('/odometry')
+def odometry_stats():
+    """
+    A Flask route with the heading, position and sensor offsets estimated from the IMU.
+    """
+    return jsonify(odometry.stats())
+
+@app.route('/channel')
+def channel_stats():
+    """
+    A Flask route with the counters of the command channel: heartbeats, stale replies and resent commands.
+    """
+    return jsonify(channel.stats())
+
+@app.route('/session')
+def session():
+    """
+    A Flask route with the counters of the session recorder.
+    """
+    return jsonify(recorder.stats() if recorder is not None else {'recording': False})
+
+@app.route('/calibrate/<color>')
+def calibrate(color):
+    """
+    A Flask route to calibrate a color from the ball region of the current frame.
+    The region is given by the x, y, w and h query parameters and defaults to a box in the center of the image.
+    """
+    if current_frame is None:
+        return jsonify({'error': 'No frame captured yet'}), 503
+    if current_frame.ndim == 2:
+        return jsonify({'error': 'Calibration needs color frames, unset MEMORY_GRAY'}), 409
+    x = request.args.get('x', 360, type=int)
+    y = request.args.get('y', 260, type=int)
+    w = request.args.get('w', 80, type=int)
+    h = request.args.get('h', 80, type=int)
+    if color not in color_ranges:
+        return jsonify({'error': f"Unknown color '{color}'"}), 400
+    color = 'red' if color == 'red2' else color  # Both red ranges come from one calibration
+    if pool is not None:  # The region is given in camera pixels
+        x, y, w, h = [max(1, round(v * pool.scale)) for v in (x, y, w, h)]
+    height, width = current_frame.shape[:2]
+    if w < 5 or h < 5 or x < 0 or y < 0 or x + w > width or y + h > height:
+        return jsonify({'error': f"Region {x},{y} {w}x{h} is not inside the {width}x{height} frame"}), 400
+    try:
+        ranges = compute_bounds(sample_region(current_frame, x, y, w, h), color)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if color == 'red' and 'red2' not in ranges:
+        ranges['red2'] = ranges['red']  # The detector uses both red ranges, neither may keep its default
+    profiles.save(ranges)  # Picked up by the detector on its next poll
+    return jsonify({name: [lower.tolist(), upper.tolist()] for name, (lower, upper) in ranges.items()})
+
+@app.route('/memory')
+def memory():
+    """
+    A Flask route with the resident memory of the process and the occupancy of the frame pool and queues.
+    """
+    return jsonify({
+        'budget': budget,
+        **memory_stats(),
+        'pool': pool.stats() if pool is not None else None,
+        'stream': broadcaster.stats(),
+        'recorder': recorder.stats() if recorder is not None else None,
+        'traces': len(tracer.traces),
+    })
+
+def emit_console(kind, color, data):
+    """
+    Sends a line to the action or log console of the web interface.
+    """
+    socketio.emit('console', {'type': kind, 'color': color, 'data': data})
+
+# Start the Flask app in a separate thread
+def start_flask():
+    run_server(
+        app, socketio, host='0.0.0.0', port=5050, max_viewers=broadcaster.max_viewers,
+        outbuf=512 * 1024 if budget else 2 * 1024 * 1024,
+    )
+
+def start():
+    """
+    Starts the web server and the camera capture threads.
+    """
+    # Start Flask server in a new thread
+    flask_thread = threading.Thread(target=start_flask)
+    flask_thread.daemon = True  # Daemonize the thread to allow the main program to exit
+    flask_thread.start()
+
+    # Start the camera capture in a separate thread
+    capture_thread = threading.Thread(target=show)
+    capture_thread.daemon = True  # Daemonize the thread to allow the main program to exit
+    capture_thread.start()
+
+
+
+
+def select_ball(cont, yh, area_max=20):
+    """
+    Selects the largest round contour below the horizon.
+
+    Returns:
+        selected (tuple): Contour index, x relative to the image center, y from the image bottom
+            and the center point for visualization, or None if no contour qualifies.
+    """
+    selected = None
+    for n in range(len(cont)):
+        M = cv.moments(cont[n])  # Calculate moments of the contour
+        area = M['m00']          # Contour area
+        if area <= area_max:
+            continue             # Also skips empty contours before dividing by the area
+        _xc = int(M['m10'] / area)  # X-coordinate of the contour center
+        _yc = 600 - int(M['m01'] / area)  # Adjust Y-coordinate to start at image bottom
+
+        # Select the largest valid contour below the horizon, rejecting clutter with the wrong shape
+        if _yc < yh and circularity(cont[n]) >= min_circularity:
+            area_max = area
+            selected = (n, _xc - 400, _yc, (_xc, 600 - _yc))
+    return selected
+
+def select_box(boxes, yh):
+    """
+    Selects the best box of the learned detector below the horizon.
+
+    Returns:
+        selected (tuple): Box index, x relative to the image center, y from the image bottom
+            and the center point for visualization, or None if no box qualifies.
+    """
+    for n, (x, y, w, h, score) in enumerate(boxes):  # Sorted by score
+        _xc, _yc = x + w // 2, 600 - (y + h // 2)
+        if _yc < yh:
+            return n, _xc - 400, _yc, (_xc, 600 - _yc)
+    return None
+
+def capture():
+    """
+    Captures an image from a camera, filters it for a specified color,
+    detects contours, and calculates the distance and angle to a detected object.
+    
+    Returns:
+        ball (int): Indicates if a ball is detected (1 if detected, 0 otherwise).
+        dist (float): Calculated distance to the ball.
+        ang_rad (float): Angle to the ball in radians.
+        ang_deg (int): Angle to the ball in degrees.
+    """
+    global cmd_no, last_detection
+    cmd_no += 1
+    print(str(cmd_no) + ': capture image', end=': ')
+
+    # Pick up profile changes, only the colors that changed are replaced
+    changed = profiles.poll(color_ranges)
+    if changed:
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#147df5',
+                'data': f"HSV profile '{profiles.name}' updated: {', '.join(changed)}",
+            }
+        )
+    if profiles.error:
+        print(profiles.error)
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#ff8700',
+                'data': profiles.error + ', keeping the previous ranges',
+            }
+        )
+
+    # Switch color filter before processing
+    lu_color_vision = switch_color('red')  # Switch to the desired color (e.g., 'green', 'blue', or 'red')
+    
+    # Fetch image from the camera
+    tracer.begin()                               # Open the trace of this frame
+    img = link.fetch('http://192.168.4.1/capture', background=False)  # Read the image bytes
+    fetched = time.monotonic()
+    tracer.mark('fetched')
+    seq = recorder.frame(img) if recorder is not None else 0  # Keep the original JPEG, no re-encoding
+    img = np.asarray(bytearray(img), dtype='uint8')  # Convert bytes to a NumPy array
+    img = cv.imdecode(img, cv.IMREAD_UNCHANGED)  # Decode the image
+    tracer.mark('decoded')
+
+    # Skip the pipeline for frames that cannot give a new or reliable detection
+    verdict = frame_gate.check(img)
+    tracer.tag('gate', verdict)
+    if verdict == 'duplicate':
+        tracer.mark('detected')
+        if recorder is not None:
+            recorder.detection(seq, *last_detection)
+        return last_detection  # Same picture, same result
+    if verdict == 'blurred':
+        tracer.mark('detected')
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#ff8700',
+                'data': f"Blurred frame skipped ({frame_gate.stats()['blurred']} so far)",
+            }
+        )
+        if recorder is not None:
+            recorder.detection(seq, 0, None, 0, 0)  # Every recorded frame has a detection, empty when rejected
+        return 0, None, 0, 0  # Treat a smeared frame as no detection
+    
+    # Initialize variables for contour evaluation
+    yh = 491          # Y-coordinate of the horizon line
+    ball = 0          # Flag indicating the presence of a ball
+    dist = None       # Distance to the ball
+    ang_rad = 0       # Angle to the ball in radians
+    ang_deg = 0       # Angle to the ball in degrees
+
+    # Learned detector when it keeps up with the frame rate, its boxes become contours for the overlay
+    boxes = detector.detect(img) if detector is not None else None
+    tracer.tag('detector', 'model' if boxes is not None else 'hsv')
+    if boxes is not None:
+        cont = [np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.int32).reshape(-1, 1, 2) for x, y, w, h, _ in boxes]
+        selected = select_box(boxes, yh)
+    else:
+        # Filter image by color and detect contours, only inside the proposed regions when there are any
+        rois = proposer.propose(img) if proposer is not None else None
+        cont = color_contours(img, lu_color_vision, rois)
+        selected = select_ball(cont, yh)
+        if selected is None and rois:
+            proposer.fallbacks += 1  # The ball may be outside the proposals, check the whole frame
+            cont = color_contours(img, lu_color_vision)
+            selected = select_ball(cont, yh)
+    if selected is not None:
+        ball = 1  # Mark a ball as detected
+        nc, xc, yc, center = selected
+    if proposer is not None:
+        proposer.remember(cv.boundingRect(cont[nc]) if ball else None)
+    
+    # Calculate distance and angle to the ball
+    if ball:
+        if broadcaster.viewers:  # Vector data for the stream, drawn by the streaming worker
+            overlay.update(cont[nc], center, '(' + str(xc) + ', ' + str(yc) + ')', fetched)
+        dy = 4.31 * (745.2 + yc) / (yh - yc)  # Calculate distance along the y-axis
+        if xc < 0: dy = dy * (1 - xc / 1848)  # Apply correction for negative x-coordinates
+        dx = 0.00252 * xc * dy                # Calculate distance along the x-axis
+        dist = np.sqrt(dx**2 + dy**2)         # Calculate the total distance
+        ang_rad = np.arctan(dx / dy)          # Calculate the angle in radians
+        ang_deg = round(ang_rad * 180 / np.pi)  # Convert the angle to degrees
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#a1ff0a',
+                'data': f"Ball detected at ({xc}, {yc}) with distance {round(dist)} cm and angle {ang_deg} degrees",
+            }
+        )
+    else:
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#ff0000',
+                'data': f"No ball detected"
+            }           
+        )
+        overlay.clear()  # Nothing to annotate
+    
+    # Display the image (guide lines and annotations are drawn by the overlay)
+    # cv.imshow('Camera', overlay.compose(img))
+    # cv.waitKey(1)  # Wait briefly to refresh the display
+    
+    last_detection = (ball, dist, ang_rad, ang_deg)  # Keep the result for duplicated frames
+    tracer.mark('detected')
+    if recorder is not None:
+        recorder.detection(seq, *last_detection)
+    return last_detection  # Return detection results
+
+
+
+
+# Send a command and receive a response
+off = [0.007, 0.022, 0.091, 0.012, -0.011, -0.05]  # Offsets for sensor calibration
+odometry = Odometry(off)  # Starts from the offsets above and re-estimates them while the car is still
+
+def cmd(sock, do, what='', where='', at='', quiet=False):
+    """
+    Sends a command to the robot and processes the response.
+
+    Parameters:
+        sock (socket.socket): The socket connection to the robot.
+        do (str): The action to perform (e.g., 'move', 'set', 'stop').
+        what (str): Additional information about the action (e.g., 'distance', 'motion').
+        where (str): Direction for movement (e.g., 'forward', 'back', 'left', 'right').
+        at (varied): Additional data such as speed, angle, or sensor reading configuration.
+        quiet (bool): Skip the console lines, for high-rate sampling such as IMU readings.
+
+    Returns:
+        res (int/float/list): The processed response from the robot.
+    """
+    global cmd_no
+    cmd_no += 1  # Increment the command counter
+    msg = {"H": str(cmd_no)}  # Initialize the command message as a dictionary with a header
+
+    # Determine the type of command and construct the message accordingly
+    if do == 'move':
+        msg["N"] = 3  # Command type for movement
+        what = ' car '
+        if where == 'forward':
+            msg["D1"] = 3  # Direction forward
+        elif where == 'back':
+            msg["D1"] = 4  # Direction backward
+        elif where == 'left':
+            msg["D1"] = 1  # Direction left
+        elif where == 'right':
+            msg["D1"] = 2  # Direction right
+        msg["D2"] = at  # 'at' represents speed here
+        where = where + ' '  # Add a space for logging
+
+    elif do == 'set':
+        msg.update({"N": 4, "D1": at[0], "D2": at[1]})  # Set speed using a tuple (at)
+        what = ' speed '
+
+    elif do == 'stop':
+        msg.update({"N": 1, "D1": 0, "D2": 0, "D3": 1})  # Stop the robot
+        what = ' car'
+
+    elif do == 'rotate':
+        msg.update({"N": 5, "D1": 1, "D2": at})  # Rotate the robot's head to an angle (at)
+        what = ' head'
+        where = ' '
+
+    elif do == 'measure':
+        if what == 'distance':
+            msg.update({"N": 21, "D1": 2})  # Measure distance
+        elif what == 'motion':
+            msg["N"] = 6  # Measure motion
+        what = ' ' + what
+
+    elif do == 'check':
+        msg["N"] = 23  # Check if the robot is off the ground
+        what = ' off the ground'
+
+    # Keep the background model only while the car and the camera are still
+    if do in ('stop', 'move', 'set'):
+        odometry.set_moving(do != 'stop')  # Offsets are only learned once the car has come to rest
+    if proposer is not None and do in ('stop', 'move', 'set'):
+        proposer.set_stationary(do == 'stop')
+    elif proposer is not None and do == 'rotate':
+        proposer.rotate(at)
+
+    if not quiet:
+        print(str(cmd_no) + ': ' + do + what + where + str(at), end=': ')
+
+    # Send the message and wait for the reply with the same id, handling potential errors
+    try:
+        sent = time.monotonic()  # Start of the command round trip
+        tracer.mark('cmd_sent')  # First command sent since the last frame
+        tracer.tag('cmd', do + what + where + str(at))
+        res = channel.request(sock, msg)  # Sent again if the reply is lost
+    except:
+        socketio.emit(
+            'console',
+            {
+                'type': 'cmd',
+                'color': '#ff0000',
+                'data': f"Error: {sys.exc_info()[0]}",
+            }           
+        )
+        sys.exit()  # Exit the program if an error occurs
+    tracer.mark('reply')
+    rtt = time.monotonic() - sent  # Same span as the cmd_sent and reply stamps of the trace
+    link.record_command(rtt)
+
+    # Process the response based on the command type
+    if res == 'ok' or res == 'true':
+        res = 1  # Successful response
+    elif res == 'false':
+        res = 0  # Negative response
+    elif msg.get("N") == 21:
+        res = round(int(res) * 1.3, 1)  # Correct the distance measurement
+    elif msg.get("N") == 6:
+        res = res.split(",")  # Split the motion data into components
+        res = [int(x) / 16384 for x in res]  # Convert to units of g
+        res[2] = res[2] - 1  # Subtract 1G from the z-axis measurement
+        res = odometry.correct(res)  # Apply the current calibration offsets
+    else:
+        res = int(res)  # Convert the response to an integer for other cases
+
+    # Record the command and its reply without waiting on the disk
+    if recorder is not None:
+        recorder.telemetry(cmd_no, msg, res, rtt)
+
+    # Log the response
+    if not quiet:
+        socketio.emit(
+            'console', 
+            {
+                'type': 'cmd',
+                'color': '#a1ff0a',
+                'data': f"{cmd_no}: {do} {what} {where} {at}: {res}",
+            }
+        )
+
+    return res  # Return the processed response
+
+
+
+
+# Define the IP address and port of the car's WiFi
+ip = "192.168.4.1"  # IP address of the car
+port = 100          # Port number for communication
+
+# Create a socket object for the connection
+car = socket.socket()
+
+# Framing of the replies, heartbeats are dropped and replies are matched to their command
+channel = CommandChannel(timeout=1.0, retries=2)
+
+def connect():
+    """
+    Connects to the car's WiFi and reads its greeting. Exits the program if the car cannot be reached.
+    """
+    # Try to connect to the car's WiFi
+    try:
+        car.connect((ip, port))  # Connect to the specified IP and port
+    except:
+        # Handle any connection errors
+        print('Error: ', sys.exc_info()[0])  # Print the error message
+        sys.exit()  # Exit the program if connection fails
+    emit_console('action', '#a1ff0a', f"Connected to {ip}:{port}")
+
+    # Try to receive initial data from the socket
+    try:
+        data = car.recv(1024).decode()  # Receive up to 1024 bytes and decode the message
+    except:
+        # Handle any errors during data reception
+        emit_console('action', '#ff0000', f"Error: {sys.exc_info()[0]}")
+        sys.exit()  # Exit the program if data reception fails
+    emit_console('action', '#a1ff0a', f"Received: {data}")
+
+
+
+
+# Define movement parameters
+speed = 100  # Car speed
+
+def wait(seconds):
+    """
+    Sleeps, but returns as soon as the camera stream spots the ball during a search.
+
+    Returns:
+        spotted (bool): Whether the wait was cut short by a sighting.
+    """
+    if searching.is_set():
+        return spotted.wait(seconds)
+    time.sleep(seconds)
+    return False
+
+def settle(seconds=0.5):
+    """
+    Waits for the car to settle while sampling the IMU, which refines its offsets.
+    During a search the wait ends early when the camera stream spots the ball.
+    """
+    end = time.monotonic() + seconds
+    while time.monotonic() < end and not (searching.is_set() and spotted.is_set()):
+        odometry.update([cmd(car, do='measure', what='motion', quiet=True)], [time.monotonic()])
+
+def turn(where, angle, timeout):
+    """
+    Turns the car by an angle, stopping on the IMU heading instead of after a fixed time.
+
+    Args:
+        where (str): 'left' or 'right'.
+        angle (float): Angle to turn, in degrees.
+        timeout (float): Longest turn time, normally the open-loop estimate with some margin.
+    """
+    turned = odometry.turn(
+        start=lambda: cmd(car, do='move', where=where, at=speed),
+        stop=lambda: cmd(car, do='stop'),
+        sample=lambda: cmd(car, do='measure', what='motion', quiet=True),
+        angle=angle,
+        timeout=timeout,
+    )
+    emit_console('action', '#147df5', f"Turned {round(abs(turned))} of {round(abs(angle))} degrees {where}")
+
+    # The heading is counterclockwise positive with the IMU z axis up (cmd() removes +1 g from it),
+    # so a left turn must raise it; the search planner corrects bearings with this sign
+    if abs(turned) > 10 and (turned > 0) != (where == 'left'):
+        odometry.sign_errors += 1
+        emit_console('action', '#ff0000', f"IMU heading went the wrong way for a {where} turn, check the sensor mounting")
@@ -0,0 +1,155 @@
+"""
+Search Planner,
+Date: 2026-10-19,
+Description: Plans the head scan of find_ball() from the recent sightings of the ball instead of always starting at the center. Every sighting stores the bearing of the ball relative to the car, its distance, the time and the car motion (IMU heading and whether the motors were running). When a search starts, the planner extrapolates the bearing from the drift of the last sightings and corrects it by the heading change measured since then. The scan starts at that bearing and widens step by step, first toward the side the ball was drifting to. If the predicted bearing is out of reach of the head, the plan starts with a body turn. Old or missing sightings give the original center, right, left scan. Bearings are in degrees, positive to the right of the car, and head angles follow cmd(car, do='rotate'): 90 is the center.
+"""
+
+
+
+
+# Load modules
+import time  # Monotonic timestamps
+import threading  # Lock shared by the control loop and the web routes
+import numpy as np  # Least-squares drift
+from collections import deque  # Recent sightings
+
+
+
+
+class SearchPlanner:
+    """
+    Recent sightings of the ball and the scan order derived from them.
+
+    Args:
+        size (int): Number of sightings kept.
+        max_age (float): Age after which the last sighting is no longer used (s).
+        horizon (float): Longest time the bearing drift is extrapolated (s).
+        max_rate (float): Largest bearing drift taken from the sightings (deg/s).
+        step (float): Head angle between two looks of the scan (degrees), about the camera field of view.
+        head (tuple): Smallest and largest head angle.
+    """
+
+    def __init__(self, size=20, max_age=10.0, horizon=2.0, max_rate=60.0, step=40, head=(10, 170)):
+        self.sightings = deque(maxlen=size)  # (time, bearing, distance, heading, moving)
+        self.max_age = max_age
+        self.horizon = horizon
+        self.max_rate = max_rate
+        self.step = step
+        self.head = head
+        self.searches = 0
+        self.predicted = 0    # Searches planned from the sightings
+        self.looks = 0        # Head positions scanned
+        self.cancelled = 0    # Rotations skipped because the camera stream already showed the ball
+        self.found = 0        # Searches that found the ball, and the looks they needed
+        self.found_looks = 0
+        self.lock = threading.Lock()
+
+    def record(self, bearing, distance, heading, moving):
+        """
+        Stores a sighting of the ball.
+
+        Args:
+            bearing (float): Bearing of the ball relative to the car (degrees, positive to the right).
+            distance (float): Distance to the ball (cm).
+            heading (float): IMU heading of the car (degrees, counterclockwise positive).
+            moving (bool): Whether the motors were running.
+        """
+        with self.lock:
+            self.sightings.append((time.monotonic(), float(bearing), float(distance), float(heading), bool(moving)))
+
+    def predict(self, heading):
+        """
+        Predicts the current bearing of the ball.
+
+        Args:
+            heading (float): Current IMU heading of the car.
+
+        Returns:
+            bearing (float): Predicted bearing, or None without a recent sighting.
+            drift (float): Bearing drift of the last sightings (deg/s).
+        """
+        now = time.monotonic()
+        with self.lock:
+            recent = [s for s in self.sightings if now - s[0] <= self.max_age]
+        if not recent:
+            return None, 0.0
+
+        # Drift of the bearing over the recent sightings, in the frame of the last one
+        t, bearing, _, last_heading, _ = recent[-1]
+        drift = 0.0
+        if len(recent) > 1:
+            times = np.array([s[0] for s in recent])
+            bearings = np.array([s[1] + (last_heading - s[3]) for s in recent])  # Remove the turns in between
+            if times[-1] - times[0] > 0.1:
+                drift = float(np.clip(np.polyfit(times - times[-1], bearings, 1)[0], -self.max_rate, self.max_rate))
+
+        # A left turn of the car (heading up) moves the ball to the right
+        bearing += drift * min(now - t, self.horizon) + (heading - last_heading)
+        return (bearing + 180) % 360 - 180, drift
+
+    def default(self):
+        """
+        Returns the original scan: center, right and left.
+        """
+        return [('look', 90), ('look', self.head[0]), ('look', self.head[1])]
+
+    def plan(self, heading):
+        """
+        Plans the first search cycle.
+
+        Returns:
+            steps (list): ('turn', where, angle) and ('look', head angle) steps in order.
+        """
+        bearing, drift = self.predict(heading)
+        with self.lock:
+            self.searches += 1
+            if bearing is not None:
+                self.predicted += 1
+        if bearing is None:
+            return self.default()
+
+        steps = []
+        reach = 90 - self.head[0]
+        if abs(bearing) > reach:  # Behind the head range, face the ball first
+            steps.append(('turn', 'right' if bearing > 0 else 'left', abs(bearing)))
+            bearing = 0.0
+
+        # Start at the prediction and widen, first toward the drift
+        start = int(np.clip(round(90 - bearing), *self.head))
+        side = np.sign(drift) or np.sign(bearing) or 1.0
+        angles = [start]
+        for k in range(1, int((self.head[1] - self.head[0]) / self.step) + 2):
+            for s in (side, -side):
+                a = int(np.clip(start - s * k * self.step, *self.head))  # Lower head angles look to the right
+                if all(abs(a - b) >= self.step / 2 for b in angles):
+                    angles.append(a)
+        return steps + [('look', a) for a in angles]
+
+    def done(self, found, looks, cancelled):
+        """
+        Counts the outcome of a search.
+        """
+        with self.lock:
+            self.looks += looks
+            self.cancelled += cancelled
+            if found:
+                self.found += 1
+                self.found_looks += looks
+
+    def stats(self, heading):
+        """
+        Returns the planner counters and the bearing predicted for a heading as a dictionary.
+        """
+        bearing, drift = self.predict(heading)
+        with self.lock:
+            return {
+                'sightings': len(self.sightings),
+                'bearing': round(bearing, 1) if bearing is not None else None,
+                'drift': round(drift, 1),
+                'searches': self.searches,
+                'predicted': self.predicted,
+                'looks': self.looks,
+                'cancelled': self.cancelled,
+                'found': self.found,
+                'looks_to_find': round(self.found_looks / self.found, 2) if self.found else None,
+            }
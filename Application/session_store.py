@@ -0,0 +1,265 @@
+"""
+Session Store,
+Date: 2026-10-19,
+Description: Records runs of the robot (camera frames, ball detections, sensor readings and the commands sent by cmd()) for offline analysis. A session is a folder of time-based chunks. In each chunk, the JPEG payloads are appended untouched to a blob file, and frames, detections and telemetry are fixed-width NumPy records in flat files that can be opened with np.memmap. meta.json lists the record layouts and the start time of every chunk, so a reader can jump to any timestamp with a binary search instead of scanning the whole session. The writer runs in its own thread behind a bounded queue, and records are dropped (and counted) rather than blocking the control loop when the disk falls behind.
+"""
+
+
+
+
+# Load modules
+import os  # File paths
+import json  # Session metadata
+import time  # Timestamps
+import queue  # Bounded hand-off to the writer thread
+import bisect  # Chunk lookup by time
+import threading  # Writer thread
+import numpy as np  # Record arrays and memory mapping
+
+
+
+
+# Fixed-width records, little-endian so files are portable between the Pi and a laptop
+FRAME_DTYPE = np.dtype([('t', '<f8'), ('seq', '<u4'), ('offset', '<u8'), ('length', '<u4')])
+DETECTION_DTYPE = np.dtype([('t', '<f8'), ('seq', '<u4'), ('ball', 'u1'), ('dist', '<f4'), ('ang_rad', '<f4'), ('ang_deg', '<i2')])
+TELEMETRY_DTYPE = np.dtype([('t', '<f8'), ('cmd_no', '<u4'), ('n', '<i2'), ('d1', '<f4'), ('d2', '<f4'), ('res', '<f4'), ('motion', '<f4', (6,)), ('rtt', '<f4')])
+
+FILES = {'frames': 'frames.idx', 'detections': 'detections.rec', 'telemetry': 'telemetry.rec'}
+DTYPES = {'frames': FRAME_DTYPE, 'detections': DETECTION_DTYPE, 'telemetry': TELEMETRY_DTYPE}
+
+def number(value):
+    """
+    Converts a command field to a float, NaN when it is missing or not numeric.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+
+
+class SessionWriter:
+    """
+    Appends frames, detections and telemetry of a run to a chunked session folder.
+
+    Args:
+        directory (str): Session folder, created if it does not exist.
+        chunk_seconds (float): Duration of each chunk before a new one is started.
+        queue_size (int): Records waiting for the disk before new ones are dropped.
+    """
+
+    def __init__(self, directory, chunk_seconds=60, queue_size=512):
+        self.directory = directory
+        self.chunk_seconds = chunk_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.seq = 0          # Sequence number of the last frame handed to the writer
+        self.dropped = 0      # Records dropped because the queue was full
+        self.written = 0      # Records written to disk
+        self.chunks = []      # Chunk names and start times, mirrored in meta.json
+        self.files = {}       # Open files of the current chunk
+        self.blob_size = 0    # Size of the current blob file
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1  # Never wait on the disk from the control loop
+
+    def frame(self, jpeg):
+        """
+        Queues the raw JPEG bytes of a camera frame.
+
+        Returns:
+            seq (int): Sequence number to link detections to this frame.
+        """
+        self.seq += 1
+        t = time.time()
+        self.put(('frames', t, (t, self.seq, jpeg)))
+        return self.seq
+
+    def detection(self, seq, ball, dist, ang_rad, ang_deg):
+        """
+        Queues the result of capture() for the frame with the given sequence number.
+        """
+        t = time.time()
+        self.put(('detections', t, (t, seq, ball, number(dist), ang_rad, ang_deg)))
+
+    def telemetry(self, cmd_no, msg, res, rtt=np.nan):
+        """
+        Queues a command sent by cmd() with its processed reply and round-trip time (s). Motion replies fill the motion field.
+        """
+        motion = res if isinstance(res, list) else [np.nan] * 6
+        res = np.nan if isinstance(res, list) else number(res)
+        t = time.time()
+        self.put(('telemetry', t, (t, cmd_no, msg.get("N", -1), number(msg.get("D1")), number(msg.get("D2")), res, motion, rtt)))
+
+    def close(self, timeout=10.0):
+        """
+        Flushes the queue and closes the session.
+
+        Returns:
+            closed (bool): False if the writer thread died or did not drain the queue within the timeout.
+        """
+        if not self.thread.is_alive():
+            return False  # Writer failed (e.g. disk full), nothing would take the end marker
+        try:
+            self.queue.put(None, timeout=timeout)  # The end marker itself must not be dropped
+        except queue.Full:
+            return False
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def open_chunk(self, t):
+        """
+        Closes the current chunk and starts a new one at time t.
+        """
+        for f in self.files.values():
+            f.close()
+        name = f'chunk_{len(self.chunks):05d}'
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        self.files = {kind: open(os.path.join(path, file), 'ab') for kind, file in FILES.items()}
+        self.files['blob'] = open(os.path.join(path, 'frames.blob'), 'ab')
+        self.blob_size = 0
+        self.chunks.append({'name': name, 't_start': t})
+        self.write_meta()
+
+    def write_meta(self):
+        meta = {
+            'chunks': self.chunks,
+            'dtypes': {kind: dtype.descr for kind, dtype in DTYPES.items()},
+        }
+        tmp = os.path.join(self.directory, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp, os.path.join(self.directory, 'meta.json'))
+
+    def write(self, kind, t, record):
+        """
+        Appends one record to the current chunk, starting a new chunk when it is due.
+        """
+        if not self.chunks or t - self.chunks[-1]['t_start'] >= self.chunk_seconds:
+            self.open_chunk(t)
+
+        if kind == 'frames':
+            t, seq, jpeg = record
+            record = (t, seq, self.blob_size, len(jpeg))  # Index entry pointing into the blob
+            self.files['blob'].write(jpeg)
+            self.blob_size += len(jpeg)
+        self.files[kind].write(np.array([record], dtype=DTYPES[kind]).tobytes())
+        self.written += 1
+
+    def run(self):
+        """
+        Writer thread: drains the queue in batches and flushes after each batch.
+        """
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            while item is not None and not self.queue.empty():
+                item = self.queue.get_nowait()
+                batch.append(item)
+
+            for item in batch:
+                if item is None:
+                    break
+                self.write(*item)
+            for f in self.files.values():
+                f.flush()  # Make the batch visible to readers
+
+            if batch[-1] is None:
+                for f in self.files.values():
+                    f.close()
+                return
+
+    def stats(self):
+        """
+        Returns the writer counters as a dictionary.
+        """
+        return {
+            'frames': self.seq,
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'chunks': len(self.chunks),
+        }
+
+
+
+
+class SessionReader:
+    """
+    Random access to a recorded session without loading it into memory.
+
+    Args:
+        directory (str): Session folder written by SessionWriter.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.chunks = meta['chunks']
+        self.starts = [c['t_start'] for c in self.chunks]
+
+        # Record layouts of the session itself, older sessions may lack fields added since
+        self.dtypes = dict(DTYPES)
+        for kind, descr in meta.get('dtypes', {}).items():
+            self.dtypes[kind] = np.dtype([tuple(f[:2]) + tuple(tuple(x) for x in f[2:]) for f in descr])
+
+    def records(self, kind, chunk):
+        """
+        Memory-maps the records of one kind ('frames', 'detections' or 'telemetry') of a chunk.
+        """
+        path = os.path.join(self.directory, self.chunks[chunk]['name'], FILES[kind])
+        size = os.path.getsize(path) // self.dtypes[kind].itemsize
+        if size == 0:
+            return np.zeros(0, dtype=self.dtypes[kind])  # np.memmap cannot map an empty file
+        return np.memmap(path, dtype=self.dtypes[kind], mode='r', shape=(size,))
+
+    def seek(self, t, kind='telemetry'):
+        """
+        Finds the first record at or after time t.
+
+        Returns:
+            chunk (int): Index of the chunk holding the record.
+            row (int): Index of the record in that chunk.
+        """
+        chunk = max(0, bisect.bisect_right(self.starts, t) - 1)
+        row = int(np.searchsorted(self.records(kind, chunk)['t'], t))
+        return chunk, row
+
+    def between(self, t0, t1, kind='telemetry'):
+        """
+        Yields the record arrays of every chunk overlapping [t0, t1), trimmed to that interval.
+        """
+        chunk, row = self.seek(t0, kind)
+        for n in range(chunk, len(self.chunks)):
+            if self.starts[n] >= t1:
+                break
+            rec = self.records(kind, n)
+            end = int(np.searchsorted(rec['t'], t1))
+            yield rec[row if n == chunk else 0:end]
+
+    def frame_at(self, t):
+        """
+        Reads the JPEG bytes of the last frame captured at or before time t.
+
+        Returns:
+            jpeg (bytes): Encoded frame, or None if no frame precedes t.
+        """
+        chunk = max(0, bisect.bisect_right(self.starts, t) - 1)
+        while chunk >= 0:
+            idx = self.records('frames', chunk)
+            row = int(np.searchsorted(idx['t'], t, side='right')) - 1
+            if row >= 0:
+                with open(os.path.join(self.directory, self.chunks[chunk]['name'], 'frames.blob'), 'rb') as f:
+                    f.seek(int(idx[row]['offset']))
+                    return f.read(int(idx[row]['length']))
+            chunk -= 1  # The frame may be at the end of the previous chunk
+        return None
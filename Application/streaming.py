@@ -0,0 +1,140 @@
+"""
+Streaming and Web Server,
+Date: 2026-10-19,
+Description: Shared MJPEG streaming and server start-up for the robot applications. The camera thread publishes each frame once to a broadcaster, which draws the overlays (if any), encodes it to JPEG a single time and wakes up every connected viewer, instead of every /video_feed client re-encoding the frame on its own timer. The number of viewers is capped. The server runs either on the Werkzeug development server (default) or, with SERVER_MODE=production, on Waitress with a fixed thread pool and a bounded output buffer per connection, so extra browsers cannot starve the control loop. Under Waitress, Socket.IO clients use long-polling.
+"""
+
+
+
+
+# Load modules
+import os  # Environment configuration
+import threading  # Thread-based parallelism
+import cv2 as cv  # OpenCV for computer vision tasks
+from flask import Response  # Streaming responses
+
+
+
+
+class FrameBroadcaster:
+    """
+    Holds the latest JPEG-encoded frame and hands it to a bounded set of viewers.
+
+    Args:
+        max_viewers (int): Maximum number of simultaneous /video_feed clients.
+        quality (int): JPEG quality used for the stream.
+        timeout (float): Time a viewer waits for a new frame before the last one is sent again, so a closed connection is noticed while the camera is paused.
+        compose (callable): Optional function that returns an annotated copy of a frame, given the frame and its fetch time, before encoding.
+    """
+
+    def __init__(self, max_viewers=4, quality=80, timeout=1.0, compose=None):
+        self.max_viewers = max_viewers
+        self.compose = compose
+        self.quality = quality
+        self.timeout = timeout
+        self.jpeg = None      # Latest encoded frame
+        self.seq = 0          # Sequence number of the latest frame
+        self.viewers = 0      # Connected viewers
+        self.encoded = 0      # Frames encoded since start
+        self.rejected = 0     # Viewers turned away because the limit was reached
+        self.cond = threading.Condition()
+
+    def publish(self, img, stamp=None):
+        """
+        Annotates and encodes a frame once for all viewers. Nothing is drawn or encoded while nobody is watching.
+
+        Args:
+            img (numpy.ndarray): Frame to stream.
+            stamp (float): Monotonic time the frame was fetched, passed to compose.
+        """
+        if self.viewers == 0 or img is None:
+            return
+        if self.compose is not None:
+            img = self.compose(img, stamp)
+        ret, jpeg = cv.imencode('.jpg', img, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ret:
+            return
+        with self.cond:
+            self.jpeg = jpeg.tobytes()
+            self.seq += 1
+            self.encoded += 1
+            self.cond.notify_all()
+
+    def frames(self):
+        """
+        Generator of multipart chunks for one viewer. It yields every new frame, and the last one again as a keep-alive when none arrives within the timeout.
+        """
+        seq = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.seq != seq, timeout=self.timeout)
+                if self.jpeg is None:
+                    continue  # Nothing streamed yet
+                seq, jpeg = self.seq, self.jpeg
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n\r\n')
+
+    def release(self):
+        """
+        Frees the slot of a viewer when its response is closed.
+        """
+        with self.cond:
+            self.viewers -= 1
+
+    def response(self):
+        """
+        Builds the /video_feed response, or a 503 if the viewer limit is reached.
+        """
+        with self.cond:
+            if self.viewers >= self.max_viewers:
+                self.rejected += 1
+                return Response('Too many viewers', status=503)
+            self.viewers += 1
+        response = Response(self.frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+        response.call_on_close(self.release)  # Runs even if the client leaves before the first frame
+        return response
+
+    def stats(self):
+        """
+        Returns the broadcaster counters as a dictionary.
+        """
+        with self.cond:
+            return {
+                'viewers': self.viewers,
+                'max_viewers': self.max_viewers,
+                'encoded': self.encoded,
+                'rejected': self.rejected,
+            }
+
+
+
+
+def run_server(app, socketio, host='0.0.0.0', port=5050, max_viewers=4, outbuf=2 * 1024 * 1024):
+    """
+    Runs the web server in the mode selected by the SERVER_MODE environment variable.
+
+    Args:
+        app (flask.Flask): The Flask application.
+        socketio (flask_socketio.SocketIO): The Socket.IO server wrapping the application.
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        max_viewers (int): Viewer limit, used to size the production thread pool.
+        outbuf (int): Output buffer of a production connection before a slow viewer is blocked (bytes).
+    """
+    mode = os.environ.get('SERVER_MODE', 'dev')
+    if mode == 'production':
+        from waitress import serve  # Only needed in production mode
+
+        # Every browser holds a thread for its stream and about two for Socket.IO long-polling,
+        # the headroom serves commands, API requests and page loads
+        serve(
+            app,
+            host=host,
+            port=port,
+            threads=3 * max_viewers + 4,
+            connection_limit=3 * max_viewers + 16,
+            outbuf_high_watermark=outbuf,  # Block a slow viewer instead of buffering without limit
+            channel_timeout=30,
+        )
+    else:
+        socketio.run(app, host=host, port=port, allow_unsafe_werkzeug=True)
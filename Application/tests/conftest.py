@@ -0,0 +1,12 @@
+"""
+Test configuration: makes the application modules importable from the tests folder.
+"""
+
+
+
+
+# Load modules
+import os  # File paths
+import sys  # Module search path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
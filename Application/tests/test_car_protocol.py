@@ -0,0 +1,163 @@
+"""
+Car Command Protocol Tests,
+Date: 2026-10-19,
+Description: Deterministic tests of the CommandChannel framing and retries. Bytes are fed directly to feed(), or sent over a socket pair whose other end plays the car, so every split, merge, heartbeat, lost reply and timeout is fixed by the test instead of by random impairments. bench_protocol.py keeps the throughput and tail-latency measurements.
+"""
+
+
+
+
+# Load modules
+import json  # Command messages
+import socket  # Socket pair standing in for the car link
+import threading  # Car side of the socket pair
+import pytest  # Test runner
+from car_protocol import CommandChannel  # Module under test
+
+
+
+
+def car(sock, replies):
+    """
+    Plays the car on one end of a socket pair: reads commands and answers each with the next entry of replies.
+    None drops the reply. Returns the list of commands received, filled in while the thread runs.
+    """
+    received = []
+
+    def serve():
+        buffer = ''
+        while len(received) < len(replies):
+            data = sock.recv(1024)
+            if not data:
+                return
+            buffer += data.decode()
+            while '}' in buffer:
+                frame, buffer = buffer.split('}', 1)
+                msg = json.loads(frame + '}')
+                reply = replies[len(received)]
+                received.append(msg)
+                if reply is not None:
+                    sock.sendall(('{' + msg['H'] + '_' + reply + '}').encode())
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return received, thread
+
+@pytest.fixture
+def link():
+    ours, theirs = socket.socketpair()
+    yield ours, theirs
+    ours.close()
+    theirs.close()
+
+
+
+
+def test_utf8_character_split_between_reads():
+    channel = CommandChannel()
+    text = '{Estado: batería ✓}{7_ok}'.encode()
+    cut = text.index('✓'.encode()) + 1  # Inside the three bytes of the check mark
+    channel.feed(text[:cut])
+    channel.feed(text[cut:])
+    assert channel.replies == {'7': 'ok'}
+    assert channel.garbage == 1  # The status text is not a reply
+    assert channel.text == ''
+
+def test_reply_split_into_single_bytes():
+    channel = CommandChannel()
+    for byte in b'{12_25}':
+        channel.feed(bytes([byte]))
+    assert channel.replies == {'12': '25'}
+    assert channel.received == 1
+
+def test_several_replies_in_one_read():
+    channel = CommandChannel()
+    channel.feed(b'{1_ok}{2_25}{3_false}')
+    assert channel.replies == {'1': 'ok', '2': '25', '3': 'false'}
+    assert channel.received == 3
+
+def test_heartbeats_and_noise_between_frames():
+    channel = CommandChannel()
+    channel.feed(b'{Heartbeat}stray{4_ok}{Heartbeat}{Estado}')
+    assert channel.replies == {'4': 'ok'}
+    assert channel.heartbeats == 2
+    assert channel.garbage == 2  # Text outside a frame and a frame without an id
+
+def test_frame_cut_short_is_dropped():
+    channel = CommandChannel()
+    channel.feed(b'{5_o{6_ok}')  # The start of reply 5 was lost
+    assert channel.replies == {'6': 'ok'}
+    assert channel.garbage == 1
+
+def test_out_of_order_replies_are_kept_until_read(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1)
+    theirs.sendall(b'{9_b}{8_a}')
+    assert channel.read(ours, '8', 0.1) == 'a'
+    assert channel.read(ours, '9', 0.1) == 'b'  # Arrived first, still waiting
+    assert channel.stale == 0
+
+def test_replies_to_older_commands_are_stale(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1)
+    theirs.sendall(b'{3_late}{5_ok}')
+    assert channel.read(ours, 5, 0.1) == 'ok'
+    assert channel.replies == {}
+    assert channel.stale == 1
+
+def test_oldest_unread_reply_is_dropped_beyond_keep():
+    channel = CommandChannel(keep=2)
+    channel.feed(b'{1_a}{2_b}{3_c}')
+    assert channel.replies == {'2': 'b', '3': 'c'}
+    assert channel.stale == 1
+
+def test_lost_reply_is_resent_with_the_same_id(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1, retries=2)
+    received, thread = car(theirs, [None, '42'])
+    assert channel.request(ours, {'N': 21, 'D1': 2, 'H': '17'}) == '42'
+    thread.join(1.0)
+    assert [msg['H'] for msg in received] == ['17', '17']
+    assert channel.stats()['sent'] == 2
+    assert channel.stats()['resent'] == 1
+    assert channel.stats()['failed'] == 0
+
+def test_pipelined_command_is_not_sent_twice(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1, retries=2)
+    received, thread = car(theirs, ['ok', 'ok'])
+    msg = {'N': 5, 'D1': 1, 'D2': 90, 'H': '3'}
+    channel.send(ours, msg)
+    assert channel.request(ours, msg, sent=True) == 'ok'
+    assert channel.stats()['sent'] == 1
+    assert channel.stats()['resent'] == 0
+    assert len(received) == 1
+
+def test_pipelined_lost_reply_is_counted_as_resent(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1, retries=2)
+    received, thread = car(theirs, [None, 'ok'])
+    msg = {'N': 6, 'H': '4'}
+    channel.send(ours, msg)
+    assert channel.request(ours, msg, sent=True) == 'ok'
+    thread.join(1.0)
+    assert len(received) == 2
+    assert channel.stats()['resent'] == 1
+
+def test_retries_exhausted(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.05, retries=2)
+    received, thread = car(theirs, [None, None, None])
+    with pytest.raises(TimeoutError):
+        channel.request(ours, {'N': 23, 'H': '8'})
+    thread.join(1.0)
+    assert len(received) == 3  # First send and two retries
+    assert channel.stats()['resent'] == 2
+    assert channel.stats()['failed'] == 1
+
+def test_closed_connection(link):
+    ours, theirs = link
+    channel = CommandChannel(timeout=0.1)
+    theirs.close()
+    with pytest.raises(ConnectionError):
+        channel.read(ours, '1', 0.1)
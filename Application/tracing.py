@@ -0,0 +1,113 @@
+"""
+Latency Tracing,
+Date: 2026-10-19,
+Description: End-to-end latency tracing from camera capture to motor command. Every frame processed by the control loop opens a trace with an ID, and each stage (HTTP fetch, decode, detection, decision, command send and reply) stamps it with a monotonic timestamp. Only the first stamp of a stage is kept, so a command stamp tells how old the frame behind the first command sent after it was. Finished traces go to a fixed-size ring buffer that can be dumped as JSON or summarized as p50/p95/p99 per stage.
+"""
+
+
+
+
+# Load modules
+import time  # Monotonic timestamps
+import threading  # Thread-local active trace and lock for the ring buffer
+import numpy as np  # Percentiles
+from collections import deque  # Ring buffer
+
+
+
+
+# Stages in the order they happen for one frame
+STAGES = ['fetch_start', 'fetched', 'decoded', 'detected', 'decision', 'cmd_sent', 'reply']
+
+class Tracer:
+    """
+    Collects per-frame traces in a ring buffer.
+
+    Args:
+        size (int): Number of finished traces kept in memory.
+    """
+
+    def __init__(self, size=500):
+        self.traces = deque(maxlen=size)
+        self.next_id = 0
+        self.local = threading.local()  # Active trace of each thread
+        self.lock = threading.Lock()
+
+    def begin(self):
+        """
+        Opens a new trace for the calling thread, closing the previous one if it is still open.
+        """
+        self.end()
+        with self.lock:
+            self.next_id += 1
+            trace_id = self.next_id
+        self.local.trace = {'id': trace_id, 'stages': {}, 'tags': {}}
+        self.mark(STAGES[0])
+
+    def mark(self, stage):
+        """
+        Stamps a stage of the active trace, keeping only the first time it is reached.
+        """
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None:
+            trace['stages'].setdefault(stage, time.monotonic())
+
+    def tag(self, key, value):
+        """
+        Attaches a value to the active trace, e.g. the command that was sent.
+        """
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None:
+            trace['tags'].setdefault(key, value)
+
+    def end(self):
+        """
+        Closes the active trace and stores it in the ring buffer.
+        """
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            return
+        self.local.trace = None
+        with self.lock:
+            self.traces.append(trace)
+
+    def dump(self):
+        """
+        Returns the finished traces with times in milliseconds relative to the fetch start.
+        """
+        with self.lock:
+            traces = list(self.traces)
+        return [
+            {
+                'id': t['id'],
+                'start': t['stages'][STAGES[0]],
+                'stages': {s: round((v - t['stages'][STAGES[0]]) * 1000, 2) for s, v in t['stages'].items()},
+                'tags': t['tags'],
+            }
+            for t in traces
+        ]
+
+    def summary(self):
+        """
+        Computes p50/p95/p99 of each stage duration, measured from the previous stage reached in the same trace.
+
+        Returns:
+            summary (dict): Stage name to count and percentiles in milliseconds, plus 'total' for the whole trace.
+        """
+        with self.lock:
+            traces = list(self.traces)
+
+        durations = {s: [] for s in STAGES[1:] + ['total']}
+        for t in traces:
+            stamps = [(s, t['stages'][s]) for s in STAGES if s in t['stages']]
+            for (_, prev), (stage, now) in zip(stamps, stamps[1:]):
+                durations[stage].append(now - prev)
+            durations['total'].append(stamps[-1][1] - stamps[0][1])
+
+        summary = {}
+        for stage, values in durations.items():
+            if not values:
+                continue
+            p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+            summary[stage] = {'count': len(values), 'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2)}
+        return summary